@@ -1,23 +1,40 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit import config as st_config
+from streamlit.logger import set_log_level
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import ta
 from datetime import datetime, timedelta
 import pytz
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
+import os
+import sys
 import time
+import argparse
+import threading
+import weakref
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
 import warnings
 import json
+import hashlib
+from collections import OrderedDict
 from bs4 import BeautifulSoup
 import re
 from io import BytesIO
 import openpyxl
 warnings.filterwarnings('ignore')
 
+# Outside `streamlit run` (the headless CLI, imports) the st.* calls below only log bare-mode warnings
+if get_script_run_ctx(suppress_warning=True) is None:
+    st_config.set_option('logger.level', 'error')
+    st_config.set_option('global.showWarningOnDirectExecution', False)
+    set_log_level('error')  # Loggers created before the config is parsed
+
 # Set page config
 st.set_page_config(
     page_title="NSE F&O PCS Professional Scanner", 
@@ -747,33 +764,79 @@ STOCK_CATEGORIES = {
     ]
 }
 
+def _nse_equity_list_path():
+    return os.path.join(DATA_DIR, 'universe', 'EQUITY_L.csv')
+
+def _download_nse_equity_list():
+    """Download NSE's EQUITY_L.csv and keep a local copy; returns the CSV text or None"""
+    url = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': 'gzip, deflate',
+        'Connection': 'keep-alive',
+    }
+    
+    response = requests.get(url, headers=headers, timeout=10)
+    if response.status_code != 200:
+        return None
+    
+    path = _nse_equity_list_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass  # The list is still usable for this session
+    return response.text
+
+def _load_nse_equity_list():
+    """
+    EQUITY_L.csv text from the local copy, refreshed from NSE at most once per day.
+    If the refresh fails the previous copy is used for the rest of the day; None if
+    there is no copy at all.
+    """
+    path = _nse_equity_list_path()
+    cached_text = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            cached_text = f.read()
+        saved_on = datetime.fromtimestamp(os.path.getmtime(path), IST).date()
+        if saved_on == datetime.now(IST).date():
+            return cached_text
+    
+    try:
+        csv_text = _download_nse_equity_list()
+    except Exception:
+        csv_text = None
+    if csv_text is None and cached_text is not None:
+        try:
+            os.utime(path)  # Keep using the old copy today instead of retrying on every rerun
+        except OSError:
+            pass
+        return cached_text
+    return csv_text
+
 def get_nse_non_fno_stocks():
     """
     Fetch all NSE stocks and exclude F&O stocks to get non-F&O universe.
     Returns list of stock symbols with .NS suffix.
     """
     try:
-        # Try fetching from NSE website
-        url = "https://archives.nseindia.com/content/equities/EQUITY_L.csv"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-        }
+        csv_text = _load_nse_equity_list()
         
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
+        if csv_text:
             from io import StringIO
-            df = pd.read_csv(StringIO(response.text))
+            df = pd.read_csv(StringIO(csv_text))
             
             # Get all symbols and add .NS suffix
             all_symbols = [f"{symbol.strip()}.NS" for symbol in df['SYMBOL'].tolist() if pd.notna(symbol)]
             
-            # Remove F&O stocks
-            fno_symbols_clean = [s.replace('.NS', '') for s in COMPLETE_NSE_FO_UNIVERSE if s.endswith('.NS')]
+            # Remove F&O stocks (set lookup per symbol)
+            fno_symbols_clean = {s.replace('.NS', '') for s in COMPLETE_NSE_FO_UNIVERSE if s.endswith('.NS')}
             non_fno_stocks = [s for s in all_symbols if s.replace('.NS', '') not in fno_symbols_clean]
             
             return non_fno_stocks
@@ -792,7 +855,7 @@ def create_excel_stock_list(results):
     stock_symbols = []
     for result in results:
         # Remove .NS suffix and clean symbol
-        clean_symbol = result['symbol'].replace('.NS', '').replace('^', '')
+        clean_symbol = result.symbol.replace('.NS', '').replace('^', '')
         stock_symbols.append(clean_symbol)
     
     # Create Excel workbook
@@ -934,53 +997,1431 @@ def _get_comprehensive_backup_list():
         'LUXIND.NS', 'LYKALABS.NS', 'M&M.NS', 'M&MFIN.NS', 'MAANALU.NS', 'MACPOWER.NS'
     ]
 
+# Batched OHLCV acquisition settings
+DEFAULT_DOWNLOAD_BATCH_SIZE = 100
+PERIOD_MONTHS = {'1mo': 1, '2mo': 2, '3mo': 3, '6mo': 6, '1y': 12}
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+HISTORY_PERIOD = "1y"  # Covers the 3-month daily frame and the weekly resample
+WEEKLY_DATA_PERIOD = "1y"  # ~52 weekly bars; the weekly ADX needs at least two 14-week windows
+
+# =================== LOCAL OHLCV STORE ===================
+
+DATA_DIR = os.environ.get('PCS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.pcs_data'))
+IST = pytz.timezone('Asia/Kolkata')
+MARKET_OPEN_IST = (9, 15)
+MARKET_CLOSE_IST = (15, 30)
+INTRADAY_REFRESH_SECONDS = 300  # Stored bars are re-checked this often while the market is open
+ADJUSTMENT_TOLERANCE = 1e-3  # Relative close change on a re-fetched complete bar that signals a split/dividend re-adjustment
+
+def get_last_market_close(now=None):
+    """Most recent NSE session close (15:30 IST on a weekday) at or before `now`"""
+    now = now or datetime.now(IST)
+    close = now.replace(hour=MARKET_CLOSE_IST[0], minute=MARKET_CLOSE_IST[1], second=0, microsecond=0)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:  # Skip Saturday/Sunday
+        close -= timedelta(days=1)
+    return close
+
+def is_market_open(now=None):
+    """True during regular NSE trading hours on a weekday"""
+    now = now or datetime.now(IST)
+    if now.weekday() >= 5:
+        return False
+    market_open = now.replace(hour=MARKET_OPEN_IST[0], minute=MARKET_OPEN_IST[1], second=0, microsecond=0)
+    market_close = now.replace(hour=MARKET_CLOSE_IST[0], minute=MARKET_CLOSE_IST[1], second=0, microsecond=0)
+    return market_open <= now < market_close
+
+def normalize_ohlcv_frame(frame):
+    """Keep OHLCV columns on a tz-naive daily index so frames from any source can be merged"""
+    if frame is None or frame.empty:
+        return None
+    frame = frame[OHLCV_COLUMNS].dropna(subset=['Close']).copy()
+    if frame.empty:
+        return None
+    if frame.index.tz is not None:
+        frame.index = frame.index.tz_localize(None)
+    frame.index = frame.index.normalize()
+    frame.index.name = 'Date'
+    return frame
+
+def period_covered(frame, period):
+    """True when `frame` spans at least `period` back from its last bar"""
+    if frame is None or frame.empty:
+        return False
+    required_start = frame.index[-1] - pd.DateOffset(months=PERIOD_MONTHS.get(period, 12))
+    return frame.index[0] <= required_start + timedelta(days=7)  # Allow for holidays at the boundary
+
+class OHLCVStore:
+    """
+    On-disk daily OHLCV store: one Parquet file per symbol under DATA_DIR/ohlcv.
+    Files are topped up with bars newer than the last stored date, so after the
+    first run an EOD scan only needs to pull the latest session per symbol.
+    Symbols whose full download came back shorter than the period (recent listings)
+    have their first bar recorded in listings.json, so their history counts as complete.
+    """
+    
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, 'ohlcv')
+        self._listings_path = os.path.join(self.root, 'listings.json')
+        self._listings = None
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError:
+            pass  # Read-only deployments simply run without persistence
+    
+    def _path(self, symbol):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+        return os.path.join(self.root, f"{safe_name}.parquet")
+    
+    def load(self, symbol):
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            return None
+    
+    def is_fresh(self, symbol, now=None):
+        """Stored bars already include the latest completed session"""
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return False
+        now = now or datetime.now(IST)
+        written_at = os.path.getmtime(path)
+        if is_market_open(now):
+            return now.timestamp() - written_at < INTRADAY_REFRESH_SECONDS
+        return written_at >= get_last_market_close(now).timestamp()
+    
+    def covers(self, symbol, stored, period):
+        """Stored bars span `period`, or reach back to the symbol's listing when it is younger than that"""
+        if period_covered(stored, period):
+            return True
+        if stored is None or stored.empty:
+            return False
+        listing_start = self._read_listings().get(symbol)
+        return listing_start is not None and stored.index[0] <= pd.Timestamp(listing_start)
+    
+    def save_full_history(self, symbol, new_bars, period):
+        """Replace the stored history with a full `period` download; one shorter than the period marks the listing start"""
+        frame = self.append(symbol, None, new_bars)
+        if frame is not None and not period_covered(frame, period):
+            with self._lock:
+                listings = dict(self._read_listings(), **{symbol: frame.index[0].strftime('%Y-%m-%d')})
+                self._write_listings(listings)
+        return frame
+    
+    def _read_listings(self):
+        if self._listings is None:
+            try:
+                with open(self._listings_path) as handle:
+                    self._listings = json.load(handle)
+            except (OSError, ValueError):
+                self._listings = {}
+        return self._listings
+    
+    def _write_listings(self, listings):
+        self._listings = listings
+        tmp_path = f"{self._listings_path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w') as handle:
+                json.dump(listings, handle)
+            os.replace(tmp_path, self._listings_path)
+        except OSError:
+            pass  # Still known in memory for this process
+    
+    def save(self, symbol, frame):
+        path = self._path(symbol)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            frame.to_parquet(tmp_path)
+            os.replace(tmp_path, path)  # Atomic swap so concurrent readers never see a partial file
+            return True
+        except Exception:
+            return False
+    
+    @staticmethod
+    def top_up_start(stored):
+        """
+        First date a top-up re-fetches: the last stored bar, which may have been partial, and the
+        complete bar before it, which adjustment_changed compares against the stored copy
+        """
+        return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+    
+    @staticmethod
+    def adjustment_changed(stored, new_bars):
+        """
+        True when auto-adjusted top-up bars no longer line up with the stored history (a split or
+        dividend re-based past prices), so the symbol must be re-fetched in full instead of merged
+        """
+        new_bars = normalize_ohlcv_frame(new_bars)
+        if stored is None or new_bars is None:
+            return False
+        complete = stored.index[:-1].intersection(new_bars.index)
+        if complete.empty:
+            return False
+        drift = (new_bars.loc[complete, 'Close'] / stored.loc[complete, 'Close'] - 1).abs()
+        return bool(drift.max() > ADJUSTMENT_TOLERANCE)
+    
+    def append(self, symbol, stored, new_bars):
+        """Merge newly fetched bars into the stored frame (new bars win) and persist the result"""
+        new_bars = normalize_ohlcv_frame(new_bars)
+        if stored is None:
+            merged = new_bars
+        elif new_bars is None:
+            return stored  # Nothing fetched: leave the file (and its freshness) untouched
+        else:
+            merged = pd.concat([stored, new_bars])
+            merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        
+        if merged is not None:
+            self.save(symbol, merged)  # Re-saving unchanged data marks it as checked for this session
+        return merged
+
+# =================== NSE DELIVERY STORE ===================
+
+BHAVCOPY_DIR = os.environ.get('PCS_BHAVCOPY_DIR', os.path.join(DATA_DIR, 'bhavcopy'))
+BHAVCOPY_COLUMNS = ['SYMBOL', 'SERIES', 'DATE1', 'TTL_TRD_QNTY', 'DELIV_QTY', 'DELIV_PER']
+DELIVERY_SERIES = ('EQ', 'BE')
+DELIVERY_AVERAGE_WINDOWS = (5, 20)
+DELIVERY_REFRESH_SECONDS = 60  # How often lookups check the bhavcopy directory for new files
+
+BHAVCOPY_DTYPES = {'SYMBOL': str, 'SERIES': str, 'DATE1': str,
+                   'TTL_TRD_QNTY': float, 'DELIV_QTY': float, 'DELIV_PER': float}
+
+def _parse_bhavcopy_text(text, names):
+    """Equity-series delivery rows from header-less bhavcopy CSV bytes with the given column names"""
+    frame = pd.read_csv(BytesIO(text), names=names, skipinitialspace=True, na_values=['-'],
+                        usecols=BHAVCOPY_COLUMNS, dtype=BHAVCOPY_DTYPES)
+    frame = frame[frame['SERIES'].isin(DELIVERY_SERIES)]
+    return pd.DataFrame({
+        'date': pd.to_datetime(frame['DATE1'], format='%d-%b-%Y', errors='coerce'),
+        'symbol': frame['SYMBOL'],
+        'traded_qty': frame['TTL_TRD_QNTY'],
+        'delivery_qty': frame['DELIV_QTY'],
+        'delivery_pct': frame['DELIV_PER'],
+    }).dropna(subset=['date', 'delivery_pct'])
+
+def read_delivery_bhavcopies(paths):
+    """
+    NSE security-wise delivery files (sec_bhavdata_full_DDMMYYYY.csv) as one frame of date, symbol,
+    traded/delivered quantity and delivery % for the equity series. Files sharing a header are
+    concatenated and parsed in a single read_csv call; a batch that fails is retried file by file,
+    so a bad file only loses itself. Returns None when nothing could be read.
+    """
+    batches = {}
+    for path in paths:
+        try:
+            with open(path, 'rb') as handle:
+                header = handle.readline()
+                body = handle.read()
+        except OSError:
+            continue
+        names = tuple(column.strip() for column in header.decode('utf-8', 'replace').split(','))
+        if not set(BHAVCOPY_COLUMNS) <= set(names):
+            continue
+        if body and not body.endswith(b'\n'):
+            body += b'\n'
+        batches.setdefault(names, []).append(body)
+    
+    frames = []
+    for names, bodies in batches.items():
+        try:
+            frames.append(_parse_bhavcopy_text(b''.join(bodies), list(names)))
+        except Exception:
+            for body in bodies:
+                try:
+                    frames.append(_parse_bhavcopy_text(body, list(names)))
+                except Exception:
+                    continue
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+def grouped_trailing_mean(values, group_starts, window):
+    """Mean of the last `window` non-NaN values within each row's group (rows sorted by group), as a rows x window gather"""
+    values = np.asarray(values, dtype=float)
+    rows = np.arange(len(values))
+    positions = rows[:, None] - np.arange(window)[None, :]
+    in_group = positions >= np.asarray(group_starts)[:, None]
+    window_values = np.where(in_group, values[np.maximum(positions, 0)], np.nan)
+    valid = ~np.isnan(window_values)
+    count = valid.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count > 0, np.where(valid, window_values, 0.0).sum(axis=1) / count, np.nan)
+
+class DeliveryStore:
+    """
+    Reported NSE delivery data, ingested from bhavcopy CSVs dropped into BHAVCOPY_DIR.
+    Rows are kept in one Parquet file under DATA_DIR/delivery, sorted by (symbol, date), with
+    5/20-session rolling averages precomputed at ingestion. In memory each symbol maps to its
+    row range, so a lookup is a dict hit plus a search over that symbol's sessions.
+    """
+    
+    def __init__(self, root=None, inbox=None):
+        self.root = root or os.path.join(DATA_DIR, 'delivery')
+        self.inbox = inbox or BHAVCOPY_DIR
+        self._path = os.path.join(self.root, 'delivery.parquet')
+        self._manifest_path = os.path.join(self.root, 'ingested.json')
+        self._lock = threading.Lock()
+        # (symbol -> row range, column arrays), replaced as one reference so a lookup never
+        # pairs ranges from one version of the store with columns from another
+        self._index = ({}, {})
+        self._loaded = False
+        self._checked_at = None
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError:
+            pass  # Read-only deployments simply run without delivery data
+    
+    def pending_files(self):
+        """Bhavcopy CSVs in the inbox that have not been ingested yet"""
+        if not os.path.isdir(self.inbox):
+            return []
+        ingested = self._read_manifest()
+        return sorted(
+            os.path.join(self.inbox, name) for name in os.listdir(self.inbox)
+            if name.lower().endswith('.csv') and name not in ingested
+        )
+    
+    def ingest(self, paths=None):
+        """Parse bhavcopy files (default: every pending file in the inbox) into the store; returns the number of rows added"""
+        with self._lock:
+            paths = self.pending_files() if paths is None else list(paths)
+            if not paths:
+                return 0
+            
+            parsed = read_delivery_bhavcopies(paths)
+            stored = self._read_store()
+            stored_rows = 0 if stored is None else len(stored)
+            if parsed is not None:
+                combined = parsed if stored is None else pd.concat([stored, parsed], ignore_index=True)
+                combined = combined.drop_duplicates(['symbol', 'date'], keep='last')
+                combined = combined.sort_values(['symbol', 'date'], ignore_index=True)
+                combined = self._with_rolling_averages(combined)
+                tmp_path = f"{self._path}.{threading.get_ident()}.tmp"
+                try:
+                    combined.to_parquet(tmp_path, index=False)
+                    os.replace(tmp_path, self._path)
+                except Exception:
+                    pass  # Still usable in memory for this process
+                self._index = self._build_index(combined)
+                stored = combined
+            
+            # Unreadable files are recorded too, so they are not re-parsed on every check
+            self._write_manifest(self._read_manifest() | {os.path.basename(path) for path in paths})
+            return (0 if stored is None else len(stored)) - stored_rows
+    
+    def lookup(self, symbol, date=None):
+        """Delivery figures for `symbol` (no .NS suffix) on `date`, default the latest stored session; None when absent"""
+        self._refresh()
+        ranges, columns = self._index
+        span = ranges.get(symbol)
+        if span is None:
+            return None
+        start, stop = span
+        dates = columns['date']
+        if date is None:
+            row = stop - 1
+        else:
+            session = np.datetime64(pd.Timestamp(date).normalize().tz_localize(None), 'ns')
+            row = start + int(np.searchsorted(dates[start:stop], session, side='right')) - 1
+            if row < start or dates[row] != session:
+                return None
+        record = {name: values[row].item() for name, values in columns.items() if name != 'date'}
+        record['date'] = pd.Timestamp(dates[row])
+        record['symbol'] = symbol
+        return record
+    
+    def _refresh(self):
+        """Load the store once and pick up newly dropped files at most every DELIVERY_REFRESH_SECONDS"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < DELIVERY_REFRESH_SECONDS:
+            return
+        self._checked_at = now
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    stored = self._read_store()
+                    if stored is not None:
+                        self._index = self._build_index(stored)
+                    self._loaded = True
+        if self.pending_files():
+            self.ingest()
+    
+    @staticmethod
+    def _build_index(frame):
+        """(symbol -> row range, column arrays) for a store frame sorted by (symbol, date)"""
+        symbols = frame['symbol'].to_numpy()
+        names, starts = np.unique(symbols, return_index=True)
+        stops = np.append(starts[1:], len(symbols))
+        order = np.argsort(starts)  # np.unique sorts names; rows are already grouped by symbol
+        ranges = {names[i]: (int(starts[i]), int(stops[i])) for i in order}
+        columns = {
+            name: frame[name].to_numpy(dtype='datetime64[ns]' if name == 'date' else float)
+            for name in frame.columns if name != 'symbol'
+        }
+        return ranges, columns
+    
+    @staticmethod
+    def _with_rolling_averages(frame):
+        symbols = frame['symbol'].to_numpy()
+        is_start = np.concatenate([[True], symbols[1:] != symbols[:-1]])
+        group_starts = np.maximum.accumulate(np.where(is_start, np.arange(len(frame)), 0))
+        for window in DELIVERY_AVERAGE_WINDOWS:
+            frame[f'delivery_pct_avg_{window}'] = grouped_trailing_mean(frame['delivery_pct'], group_starts, window)
+            frame[f'delivery_qty_avg_{window}'] = grouped_trailing_mean(frame['delivery_qty'], group_starts, window)
+        return frame
+    
+    def _read_store(self):
+        if not os.path.exists(self._path):
+            return None
+        try:
+            return pd.read_parquet(self._path)
+        except Exception:
+            return None
+    
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as handle:
+                return set(json.load(handle))
+        except (OSError, ValueError):
+            return set()
+    
+    def _write_manifest(self, names):
+        try:
+            with open(self._manifest_path, 'w') as handle:
+                json.dump(sorted(names), handle)
+        except OSError:
+            pass
+
+# =================== IN-MEMORY CACHES ===================
+
+CACHE_TTL_SECONDS = 300  # 5-minute data cache
+PRICE_CACHE_MAX_ENTRIES = 3000
+INDICATOR_CACHE_MAX_ENTRIES = 6000  # Daily and weekly frames per symbol
+SCAN_CACHE_MAX_ENTRIES = 8
+# Unfiltered detections per symbol, latest bar and detection settings; the key pins the bars, so they can live longer
+DETECTION_CACHE_MAX_ENTRIES = 6000
+DETECTION_CACHE_TTL_SECONDS = 6 * 3600
+ENHANCEMENT_CACHE_MAX_ENTRIES = 3000
+SENTIMENT_REFRESH_SECONDS = 300  # Index sentiment is re-fetched at most this often
+# Config fields that change how a scan runs or is displayed, but not what it finds
+# (market_sentiment is the sidebar's live snapshot; scans record their own)
+SCAN_DISPLAY_ONLY_FIELDS = ('show_charts', 'show_news', 'news_ttl_minutes', 'export_results', 'max_workers',
+                            'symbol_timeout', 'download_batch_size', 'panel_prefilter', 'market_sentiment')
+
+def get_trading_date(now=None):
+    """Session the latest bars belong to: today while the market is open, else the last close"""
+    now = now or datetime.now(IST)
+    return now.date() if is_market_open(now) else get_last_market_close(now).date()
+
+def config_fingerprint(config, exclude=SCAN_DISPLAY_ONLY_FIELDS):
+    """Stable hash of the config fields that affect scan results"""
+    relevant = {key: value for key, value in config.items() if key not in exclude}
+    payload = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def detection_fingerprint(config):
+    """Stable hash of the config fields that change what the detectors find (the rest only filter their output)"""
+    return config_fingerprint({
+        'lookback_days': int(config.get('lookback_days', 20)),
+        'volume_breakout_ratio': round(float(config.get('volume_breakout_ratio', 2.0)), 2),
+        'analysis_mode': config.get('analysis_mode', 'Daily + Weekly Combined (Recommended)'),
+        'enable_weekly_validation': bool(config.get('enable_weekly_validation', True)),
+    }, exclude=())
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries expire `ttl` seconds after they were stored.
+    Once `max_entries` is reached the least recently used entry is evicted.
+    """
+    
+    def __init__(self, max_entries, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+class TimedSnapshot:
+    """A single value recomputed at most once per `ttl` seconds; concurrent callers share one refresh"""
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._value = None
+        self._stored_at = None
+        self._lock = threading.Lock()
+    
+    def get(self, compute):
+        with self._lock:
+            if self._value is None or time.monotonic() - self._stored_at > self.ttl:
+                self._value = compute()
+                self._stored_at = time.monotonic()
+            return self._value
+
+def create_scan_caches():
+    """Price, indicator, detection and scan-result caches, the news feed, the delivery store and the EOD snapshots"""
+    return {
+        'prices': TTLCache(PRICE_CACHE_MAX_ENTRIES),
+        'indicators': TTLCache(INDICATOR_CACHE_MAX_ENTRIES),
+        'scans': TTLCache(SCAN_CACHE_MAX_ENTRIES),
+        'detections': TTLCache(DETECTION_CACHE_MAX_ENTRIES, ttl=DETECTION_CACHE_TTL_SECONDS),
+        'enhancements': TTLCache(ENHANCEMENT_CACHE_MAX_ENTRIES),
+        'sentiment': TimedSnapshot(SENTIMENT_REFRESH_SECONDS),
+        'news': NewsFeed(),
+        'delivery': DeliveryStore(),
+        'snapshots': ScanSnapshotStore(),
+    }
+
+@st.cache_resource
+def get_scan_caches():
+    """Process-wide scan caches shared by every session; they survive Streamlit reruns"""
+    return create_scan_caches()
+
+def get_market_sentiment_snapshot(caches=None):
+    """Nifty/Bank Nifty sentiment shared by the sidebar, the market tab and scans; 'as_of' is the fetch time"""
+    def compute():
+        sentiment_data = ProfessionalPCSScanner().get_market_sentiment_indicators()
+        sentiment_data['as_of'] = datetime.now(IST)
+        return sentiment_data
+    caches = caches if caches is not None else get_scan_caches()
+    return caches['sentiment'].get(compute)
+
+# =================== VECTORIZED INDICATOR KERNEL ===================
+# NumPy versions of the `ta` indicators used by the scanner (default windows, fillna=False).
+# Bars run along axis 0, so the same functions work on one symbol or a dates x symbols panel.
+
+RSI_WINDOW = 14
+ADX_WINDOW = 14
+ATR_WINDOW = 14
+STOCH_WINDOW = 14
+BB_WINDOW = 20
+BB_DEV = 2
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+
+def _shift(values):
+    """Previous bar's value (NaN on the first bar)"""
+    shifted = np.empty_like(values)
+    shifted[:1] = np.nan
+    shifted[1:] = values[:-1]
+    return shifted
+
+def _pad_front(values, length):
+    """Left-pad a rolling result with NaN rows back to the full series length"""
+    pad = np.full((length - len(values),) + values.shape[1:], np.nan)
+    return np.concatenate([pad, values], axis=0)
+
+def _rolling_window_view(values, window):
+    """(n - window + 1, ..., window) view of every trailing window, or None if the series is too short"""
+    if len(values) < window:
+        return None
+    return sliding_window_view(values, window, axis=0)
+
+def rolling_mean(values, window):
+    windows = _rolling_window_view(values, window)
+    if windows is None:
+        return np.full(values.shape, np.nan)
+    return _pad_front(windows.mean(axis=-1), len(values))
+
+def rolling_mean_std(values, window):
+    """Rolling mean and population std (ddof=0) computed from one shared window view"""
+    windows = _rolling_window_view(values, window)
+    if windows is None:
+        return np.full(values.shape, np.nan), np.full(values.shape, np.nan)
+    return _pad_front(windows.mean(axis=-1), len(values)), _pad_front(windows.std(axis=-1), len(values))
+
+def rolling_high_low(high, low, window):
+    """Highest high and lowest low over the trailing window"""
+    highs, lows = _rolling_window_view(high, window), _rolling_window_view(low, window)
+    if highs is None:
+        return np.full(high.shape, np.nan), np.full(low.shape, np.nan)
+    return _pad_front(highs.max(axis=-1), len(high)), _pad_front(lows.min(axis=-1), len(low))
+
+def ewm_mean(values, alpha, min_periods):
+    """
+    Equivalent of Series.ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().
+    Leading NaNs are back-filled with the first observation, which an adjust=False
+    EMA simply carries forward, so the recursion can run as a single linear filter.
+    """
+    valid = ~np.isnan(values)
+    seed = np.take_along_axis(values, np.expand_dims(valid.argmax(axis=0), 0), axis=0)
+    observed = np.cumsum(valid, axis=0)
+    filled = np.where(observed == 0, seed, values)
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], filled, axis=0, zi=(1 - alpha) * seed)
+    smoothed[observed < min_periods] = np.nan
+    return smoothed
+
+def ema(values, span):
+    return ewm_mean(values, 2.0 / (span + 1), span)
+
+def _recursive_filter(seed, inputs, decay, gain=1.0):
+    """[seed, y1, y2, ...] with y[i] = decay * y[i-1] + gain * inputs[i]"""
+    seed = np.expand_dims(seed, 0)
+    smoothed, _ = lfilter([gain], [1.0, -decay], inputs, axis=0, zi=decay * seed)
+    return np.concatenate([seed, smoothed], axis=0)
+
+def rsi(close, window=RSI_WINDOW):
+    change = close - _shift(close)
+    gains = np.where(change > 0, change, 0.0)
+    losses = np.where(change < 0, -change, 0.0)
+    gains[np.isnan(close)] = np.nan  # Bars before a symbol's history starts don't count towards min_periods
+    losses[np.isnan(close)] = np.nan
+    avg_gain = ewm_mean(gains, 1.0 / window, window)
+    avg_loss = ewm_mean(losses, 1.0 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """MACD line, signal line and histogram"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+def true_range(high, low, close):
+    prev_close = _shift(close)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+def atr(high, low, close, window=ATR_WINDOW):
+    """Wilder ATR seeded with the mean of the first `window` true ranges (zeros before, as in `ta`)"""
+    if len(close) < window:
+        return np.full(close.shape, np.nan)
+    ranges = true_range(high, low, close)
+    result = np.zeros(close.shape)
+    result[window - 1:] = _recursive_filter(ranges[:window].mean(axis=0), ranges[window:],
+                                            (window - 1) / window, 1.0 / window)
+    return result
+
+def adx(high, low, close, window=ADX_WINDOW):
+    """
+    ADX following `ta`'s Wilder sums: the smoothed TR/+DM/-DM series start at bar window-1,
+    ADX is seeded with the mean of the first `window` DX values and is zero before that.
+    Needs two full windows of bars; shorter series come back as NaN.
+    """
+    n = len(close)
+    if n < 2 * window:
+        return np.full(close.shape, np.nan)
+    prev_close = _shift(close)
+    directional_range = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    up_move = high - _shift(high)
+    down_move = _shift(low) - low
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    
+    def wilder_sum(values):
+        # ta leaves the final smoothed value at zero
+        summed = _recursive_filter(values[1:window + 1].sum(axis=0), values[window + 1:], 1 - 1.0 / window)
+        return np.concatenate([summed, np.zeros((1,) + summed.shape[1:])], axis=0)
+    
+    tr_sum, plus_sum, minus_sum = wilder_sum(directional_range), wilder_sum(plus_dm), wilder_sum(minus_dm)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = np.where(tr_sum != 0, 100 * plus_sum / tr_sum, 0.0)
+        minus_di = np.where(tr_sum != 0, 100 * minus_sum / tr_sum, 0.0)
+        di_total = plus_di + minus_di
+        dx = np.where(di_total != 0, 100 * np.abs((plus_di - minus_di) / di_total), 0.0)
+    
+    smoothed = np.zeros(dx.shape)
+    smoothed[window:] = _recursive_filter(dx[:window].mean(axis=0), dx[window:-1],
+                                          (window - 1) / window, 1.0 / window)
+    return np.concatenate([np.zeros((window - 1,) + dx.shape[1:]), smoothed], axis=0)
+
+def compute_daily_indicators(high, low, close):
+    """All daily indicator columns used by the scanner, sharing the 20-bar and 14-bar windows"""
+    sma_20, std_20 = rolling_mean_std(close, BB_WINDOW)
+    highest, lowest = rolling_high_low(high, low, STOCH_WINDOW)
+    macd_line, macd_signal, macd_hist = macd(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch_k = 100 * (close - lowest) / (highest - lowest)
+        williams_r = -100 * (highest - close) / (highest - lowest)
+    return {
+        'RSI': rsi(close),
+        'SMA_20': sma_20,
+        'SMA_50': rolling_mean(close, 50),
+        'EMA_20': ema(close, 20),
+        'BB_upper': sma_20 + BB_DEV * std_20,
+        'BB_lower': sma_20 - BB_DEV * std_20,
+        'BB_middle': sma_20,
+        'MACD': macd_line,
+        'MACD_signal': macd_signal,
+        'MACD_hist': macd_hist,
+        'ADX': adx(high, low, close),
+        'ATR': atr(high, low, close),
+        'Stoch_K': stoch_k,
+        'Williams_R': williams_r,
+    }
+
+def compute_screen_indicators(high, low, close):
+    """Minimal columns for the stage-1 screen: RSI, ADX and the MA-support averages"""
+    return {
+        'RSI': rsi(close),
+        'ADX': adx(high, low, close),
+        'SMA_20': rolling_mean(close, 20),
+        'EMA_20': ema(close, 20),
+    }
+
+def compute_weekly_indicators(high, low, close):
+    """Indicator columns for the weekly validation frame"""
+    macd_line, macd_signal, macd_hist = macd(close)
+    return {
+        'RSI': rsi(close),
+        'SMA_10': rolling_mean(close, 10),
+        'SMA_20': rolling_mean(close, 20),
+        'EMA_10': ema(close, 10),
+        'MACD': macd_line,
+        'MACD_signal': macd_signal,
+        'MACD_hist': macd_hist,
+        'ADX': adx(high, low, close),
+    }
+
+def add_indicator_columns(frame, compute):
+    """Run an indicator kernel over a frame's High/Low/Close and attach the resulting columns"""
+    high, low, close = (frame[column].to_numpy(dtype=float) for column in ('High', 'Low', 'Close'))
+    for name, values in compute(high, low, close).items():
+        frame[name] = values
+    return frame
+
+# =================== PIVOT ENGINE ===================
+
+def find_swing_points(values, left=2, right=2, kind='high'):
+    """
+    Swing highs (kind='high') or lows (kind='low'): bars strictly above (below) every bar
+    in the `left` bars before and the `right` bars after. The neighbour max/min comes from
+    one sliding-window view. Returns (indices, prices) as arrays in bar order.
+    """
+    values = np.asarray(values, dtype=float)
+    span = left + right + 1
+    if len(values) < span:
+        return np.array([], dtype=int), np.array([], dtype=float)
+    windows = sliding_window_view(values, span)
+    neighbours = np.concatenate([windows[:, :left], windows[:, left + 1:]], axis=1)
+    centre = windows[:, left]
+    if kind == 'high':
+        is_pivot = centre > neighbours.max(axis=1)
+    else:
+        is_pivot = centre < neighbours.min(axis=1)
+    indices = np.flatnonzero(is_pivot) + left
+    return indices, values[indices]
+
+# =================== VOLUME PROFILE ENGINE ===================
+
+VOLUME_PROFILE_BINS = 24
+VOLUME_PROFILE_LOOKBACK = 50  # Same window as the enhanced S/R analysis
+VALUE_AREA_SHARE = 0.70
+
+def compute_volume_profile(high, low, volume, bins=VOLUME_PROFILE_BINS, value_area_share=VALUE_AREA_SHARE):
+    """
+    Volume-at-price profile over equal-width price buckets from the lowest low to the highest high.
+    Each bar's volume is spread over the buckets its High-Low range overlaps (a bar with no range
+    lands in a single bucket). Returns the bucket edges/centres and volumes, the point of control,
+    the value area holding `value_area_share` of volume, and high/low volume nodes (local peaks
+    above / troughs below the average bucket). None when there is no volume to profile.
+    """
+    high, low, volume = (np.asarray(values, dtype=float) for values in (high, low, volume))
+    valid = ~(np.isnan(high) | np.isnan(low) | np.isnan(volume))
+    high, low, volume = high[valid], low[valid], volume[valid]
+    if len(volume) == 0 or volume.sum() <= 0:
+        return None
+    
+    bottom, top = low.min(), high.max()
+    if top <= bottom:
+        top = bottom + max(abs(bottom) * 1e-3, 1e-6)
+    edges = np.linspace(bottom, top, bins + 1)
+    
+    # bars x buckets share of each bar's range falling in each bucket
+    overlap = np.clip(np.minimum(high[:, None], edges[None, 1:]) - np.maximum(low[:, None], edges[None, :-1]), 0, None)
+    bar_range = (high - low)[:, None]
+    weights = np.divide(overlap, bar_range, out=np.zeros_like(overlap), where=bar_range > 0)
+    flat_bars = np.flatnonzero(bar_range[:, 0] <= 0)
+    if len(flat_bars):
+        weights[flat_bars, np.clip(np.searchsorted(edges, low[flat_bars], side='right') - 1, 0, bins - 1)] = 1.0
+    profile = (weights * volume[:, None]).sum(axis=0)
+    centres = (edges[:-1] + edges[1:]) / 2
+    
+    # Value area: grow from the point of control towards the heavier neighbouring bucket
+    poc = int(profile.argmax())
+    lower = upper = poc
+    covered, target = profile[poc], value_area_share * profile.sum()
+    while covered < target and (lower > 0 or upper < bins - 1):
+        below = profile[lower - 1] if lower > 0 else -1.0
+        above = profile[upper + 1] if upper < bins - 1 else -1.0
+        if above >= below:
+            upper += 1
+            covered += above
+        else:
+            lower -= 1
+            covered += below
+    
+    average = profile.mean()
+    peaks, _ = find_swing_points(profile, 1, 1, 'high')
+    troughs, _ = find_swing_points(profile, 1, 1, 'low')
+    return {
+        'bin_edges': edges,
+        'bin_centres': centres,
+        'volume': profile,
+        'poc': centres[poc],
+        'value_area_low': edges[lower],
+        'value_area_high': edges[upper + 1],
+        'hvn': centres[peaks[profile[peaks] >= average]],
+        'lvn': centres[troughs[profile[troughs] < average]],
+    }
+
+# =================== BAR FEATURES ===================
+
+class BarFeatures:
+    """
+    Quantities the pattern detectors share, derived once per daily frame: the latest bar's
+    fields, average volume over the 5/10/20 sessions before it, and High/Low/Volume statistics
+    over trailing windows. Window statistics skip NaN like the pandas reductions they replace.
+    """
+    VOLUME_WINDOWS = (5, 10, 20)
+    
+    def __init__(self, data):
+        self.length = len(data)
+        self.index = data.index
+        self.open, self.high, self.low, self.close, self.volume = (
+            data[column].to_numpy(dtype=float) for column in OHLCV_COLUMNS
+        )
+        self.last_open, self.last_high, self.last_low, self.last_close, self.last_volume = (
+            values[-1] if self.length else np.nan
+            for values in (self.open, self.high, self.low, self.close, self.volume)
+        )
+        self._stats = {}
+        # Average volume over the N sessions before the latest bar
+        self.avg_volume = {days: self.volume_mean(days + 1, stop=-1) for days in self.VOLUME_WINDOWS}
+    
+    def high_max(self, window, start=0, stop=None):
+        """Highest High of data.tail(window).iloc[start:stop]"""
+        return self._window_stat('high', window, start, stop)
+    
+    def low_min(self, window, start=0, stop=None):
+        """Lowest Low of data.tail(window).iloc[start:stop]"""
+        return self._window_stat('low', window, start, stop)
+    
+    def volume_mean(self, window, start=0, stop=None):
+        """Mean Volume of data.tail(window).iloc[start:stop]"""
+        return self._window_stat('volume', window, start, stop)
+    
+    def _window_stat(self, field, window, start, stop):
+        key = (field, window, start, stop)
+        if key not in self._stats:
+            values = getattr(self, field)[max(self.length - window, 0):][start:stop]
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                self._stats[key] = np.nan
+            elif field == 'high':
+                self._stats[key] = values.max()
+            elif field == 'low':
+                self._stats[key] = values.min()
+            else:
+                self._stats[key] = values.mean()
+        return self._stats[key]
+
+# =================== PATTERN REGISTRY ===================
+
+# Metadata for the current-day breakout, which is detected first and gates the other daily patterns
+CURRENT_DAY_BREAKOUT_PATTERN = {
+    'key': 'current_day_breakout',
+    'name': 'Current Day Breakout',
+    'success_rate': 92,
+    'pcs_suitability': 98,
+    'research_basis': 'Real-time EOD Breakout Confirmation',
+}
+
+# Daily chart patterns in display order. `detector` names a scanner method returning
+# (detected, strength); `cost` is the detector's relative cost (window reductions over
+# the bar features) and `default` is used when the pattern filters have no entry for `key`.
+DAILY_PATTERN_REGISTRY = [
+    {'key': 'cup_and_handle', 'name': 'Cup and Handle', 'detector': 'detect_cup_and_handle_current',
+     'success_rate': 85, 'pcs_suitability': 95, 'research_basis': 'William O\'Neil - IBD (Current Day Confirmed)',
+     'cost': 3, 'default': True},
+    {'key': 'flat_base', 'name': 'Flat Base Breakout', 'detector': 'detect_flat_base_current',
+     'success_rate': 82, 'pcs_suitability': 92, 'research_basis': 'Mark Minervini - Current Day Confirmed',
+     'cost': 2, 'default': True},
+    {'key': 'bump_and_run', 'name': 'Bump-and-Run Reversal (Bottom)', 'detector': 'detect_bump_and_run_reversal_bottom',
+     'success_rate': 78, 'pcs_suitability': 88, 'research_basis': 'Thomas Bulkowski - Encyclopedia of Chart Patterns',
+     'cost': 2, 'default': True},
+    {'key': 'rectangle_bottom', 'name': 'Rectangle Bottom', 'detector': 'detect_rectangle_bottom',
+     'success_rate': 75, 'pcs_suitability': 90, 'research_basis': 'Classical Technical Analysis - Rectangle Patterns',
+     'cost': 3, 'default': True},
+    {'key': 'rectangle_top', 'name': 'Rectangle Top', 'detector': 'detect_rectangle_top',
+     'success_rate': 72, 'pcs_suitability': 85, 'research_basis': 'Support Test After Rectangle Formation',
+     'cost': 2, 'default': False},
+    {'key': 'head_shoulders_bottom', 'name': 'Head-and-Shoulders Bottom', 'detector': 'detect_head_and_shoulders_bottom',
+     'success_rate': 83, 'pcs_suitability': 93, 'research_basis': 'Classic Reversal Pattern - Edwards & Magee',
+     'cost': 5, 'default': True},
+    {'key': 'double_bottom', 'name': 'Double Bottom (Eve & Eve)', 'detector': 'detect_double_bottom',
+     'success_rate': 80, 'pcs_suitability': 91, 'research_basis': 'Thomas Bulkowski - Double Bottom Analysis',
+     'cost': 3, 'default': True},
+    {'key': 'three_rising_valleys', 'name': 'Three Rising Valleys', 'detector': 'detect_three_rising_valleys',
+     'success_rate': 77, 'pcs_suitability': 89, 'research_basis': 'Progressive Support Levels - Bullish Continuation',
+     'cost': 5, 'default': True},
+    {'key': 'rounding_bottom', 'name': 'Rounding Bottom', 'detector': 'detect_rounding_bottom',
+     'success_rate': 74, 'pcs_suitability': 87, 'research_basis': 'Saucer Pattern - Gradual Accumulation Phase',
+     'cost': 4, 'default': True},
+    {'key': 'rounding_top_upside', 'name': 'Rounding Top (Upside Break)', 'detector': 'detect_rounding_top_upside_break',
+     'success_rate': 68, 'pcs_suitability': 85, 'research_basis': 'Rare Counter-Trend Breakout Pattern',
+     'cost': 2, 'default': False},
+    {'key': 'inverted_scallop', 'name': 'Inverted/Descending Scallop', 'detector': 'detect_inverted_scallop',
+     'success_rate': 76, 'pcs_suitability': 88, 'research_basis': 'William O\'Neil - CAN SLIM Methodology',
+     'cost': 2, 'default': True},
+]
+
+# Registry positions, cheapest detector first (ties keep display order)
+DAILY_PATTERNS_BY_COST = sorted(range(len(DAILY_PATTERN_REGISTRY)), key=lambda position: DAILY_PATTERN_REGISTRY[position]['cost'])
+
+# Pattern filter key -> enabled when the pattern filters have no entry for it
+PATTERN_FILTER_DEFAULTS = {CURRENT_DAY_BREAKOUT_PATTERN['key']: True}
+PATTERN_FILTER_DEFAULTS.update({spec['key']: spec['default'] for spec in DAILY_PATTERN_REGISTRY})
+
+# =================== NEWS KEYWORD MATCHER ===================
+
+NEWS_RELEVANCE_KEYWORDS = {
+    'high': ['order', 'contract', 'earnings', 'results', 'approval', 'launch', 'merger'],
+    'medium': ['growth', 'expansion', 'investment', 'partnership', 'policy'],
+}
+NEWS_SENTIMENT_KEYWORDS = {
+    'positive': ['order', 'win', 'contract', 'growth', 'profit', 'beat', 'strong', 'positive', 'approval'],
+    'negative': ['loss', 'decline', 'weak', 'concern', 'fall', 'drop', 'negative', 'warning'],
+}
+RELEVANCE_TIERS = ('low', 'medium', 'high')
+NEWS_IRREGULAR_FORMS = {'win': ('won',), 'fall': ('fell', 'fallen'), 'beat': ('beaten',)}
+INFLECTION_VOWELS = 'aeiou'
+
+def keyword_variants(word):
+    """
+    The inflected forms a keyword is matched in: plural/3rd person, past tense and -ing, with
+    e-drop (decline -> declined, declining), consonant doubling for one-syllable words
+    ending consonant-vowel-consonant (drop -> dropped, win -> winning), y -> ies/ied and
+    the irregular forms listed in NEWS_IRREGULAR_FORMS
+    """
+    forms = {word, word + 'es' if word.endswith(('s', 'x', 'z', 'ch', 'sh')) else word + 's'}
+    if word.endswith('e'):
+        forms |= {word + 'd', word[:-1] + 'ing'}
+    elif len(word) > 1 and word[-1] == 'y' and word[-2] not in INFLECTION_VOWELS:
+        forms |= {word[:-1] + 'ies', word[:-1] + 'ied', word + 'ing'}
+        forms.discard(word + 's')
+    else:
+        syllables = len(re.findall(f'[{INFLECTION_VOWELS}]+', word))
+        doubles = (len(word) >= 3 and syllables == 1 and word[-1] not in INFLECTION_VOWELS + 'wxy'
+                   and word[-2] in INFLECTION_VOWELS and word[-3] not in INFLECTION_VOWELS)
+        stem = word + word[-1] if doubles else word
+        forms |= {stem + 'ed', stem + 'ing'}
+    forms.update(NEWS_IRREGULAR_FORMS.get(word, ()))
+    return forms
+
+class KeywordMatcher:
+    """
+    All relevance and sentiment keywords compiled into one case-insensitive alternation.
+    Keywords match whole words in the forms `keyword_variants` lists (orders, won, declined, dropping).
+    Each distinct keyword in a headline counts once: +1 or -1 to the sentiment score, and the
+    highest tier among them is the headline's relevance ('low' when none match).
+    """
+    
+    def __init__(self, relevance_keywords=NEWS_RELEVANCE_KEYWORDS, sentiment_keywords=NEWS_SENTIMENT_KEYWORDS):
+        # keyword -> (relevance rank, sentiment delta)
+        self._keywords = {}
+        for tier, words in relevance_keywords.items():
+            for word in words:
+                rank, delta = self._keywords.get(word, (0, 0))
+                self._keywords[word] = (max(rank, RELEVANCE_TIERS.index(tier)), delta)
+        for sentiment, words in sentiment_keywords.items():
+            for word in words:
+                rank, _ = self._keywords.get(word, (0, 0))
+                self._keywords[word] = (rank, 1 if sentiment == 'positive' else -1)
+        self._word_ids = {word: position for position, word in enumerate(self._keywords)}
+        self._word_ranks = np.array([rank for rank, _ in self._keywords.values()])
+        self._word_deltas = np.array([delta for _, delta in self._keywords.values()])
+        # inflected form -> keyword
+        self._variants = {}
+        for word in self._keywords:
+            for variant in keyword_variants(word):
+                self._variants.setdefault(variant, word)
+        self._variant_ids = {variant: self._word_ids[word] for variant, word in self._variants.items()}
+        alternation = '|'.join(re.escape(variant) for variant in sorted(self._variants, key=len, reverse=True))
+        self._pattern = re.compile(rf"\b({alternation})\b", re.IGNORECASE)
+        self._batch_pattern = re.compile(rf"\n|\b(?:{alternation})\b")
+    
+    def score(self, headline):
+        """(relevance tier, sentiment score) for one headline"""
+        rank, sentiment = 0, 0
+        for word in {self._variants[match.lower()] for match in self._pattern.findall(headline)}:
+            word_rank, delta = self._keywords[word]
+            rank = max(rank, word_rank)
+            sentiment += delta
+        return RELEVANCE_TIERS[rank], sentiment
+    
+    def score_many(self, headlines):
+        """
+        (relevance tiers, sentiment scores) arrays for many headlines from one regex pass over
+        the newline-joined corpus; the separators are matched too, so counting them assigns
+        each keyword hit to its headline without a per-match Python step.
+        """
+        headlines = list(headlines)
+        ranks = np.zeros(len(headlines), dtype=int)
+        sentiments = np.zeros(len(headlines), dtype=int)
+        corpus = '\n'.join(headline.replace('\n', ' ') for headline in headlines)
+        tokens = self._batch_pattern.findall(corpus.lower())
+        codes = np.fromiter((self._variant_ids.get(token, -1) for token in tokens), dtype=int, count=len(tokens))
+        is_separator = codes < 0
+        if not is_separator.all():
+            owners = np.cumsum(is_separator)[~is_separator]
+            # Each keyword counts once per headline
+            hits = np.unique(owners * len(self._word_ids) + codes[~is_separator])
+            owners, word_ids = np.divmod(hits, len(self._word_ids))
+            np.maximum.at(ranks, owners, self._word_ranks[word_ids])
+            np.add.at(sentiments, owners, self._word_deltas[word_ids])
+        return np.array(RELEVANCE_TIERS, dtype=object)[ranks], sentiments
+
+# Built once at import and shared by every news lookup
+NEWS_KEYWORD_MATCHER = KeywordMatcher()
+
+# =================== SCAN RESULTS ===================
+
+SCAN_DATA_PERIOD = "3mo"  # History the pattern stage analyses, and the chart re-derives
+
+class ScanResult:
+    """
+    Compact record of one qualifying stock: scalar metrics, the latest bar, patterns and
+    enhancement summaries. The indicator frame is not kept; charts re-derive it from the
+    price and indicator caches with get_stock_data(symbol, data_period).
+    `sma_20`, `ema_20` and `weekly_screen` keep what the MA-support and weekly checks need,
+    so unfiltered detections can be filtered later without the frame.
+    """
+    __slots__ = ('symbol', 'current_price', 'volume_ratio', 'volume_details', 'rsi', 'adx',
+                 'trading_date', 'day_open', 'day_high', 'day_low', 'day_close',
+                 'patterns', 'enhancements', 'data_period', 'sma_20', 'ema_20', 'weekly_screen')
+    
+    def __init__(self, symbol, current_price, volume_ratio, volume_details, rsi, adx,
+                 trading_date, day_open, day_high, day_low, day_close,
+                 patterns, enhancements=None, data_period=SCAN_DATA_PERIOD,
+                 sma_20=None, ema_20=None, weekly_screen=None):
+        self.symbol = symbol
+        self.current_price = current_price
+        self.volume_ratio = volume_ratio
+        self.volume_details = volume_details
+        self.rsi = rsi
+        self.adx = adx
+        self.trading_date = trading_date
+        self.day_open = day_open
+        self.day_high = day_high
+        self.day_low = day_low
+        self.day_close = day_close
+        self.patterns = patterns
+        self.enhancements = enhancements or {}
+        self.data_period = data_period
+        self.sma_20 = sma_20
+        self.ema_20 = ema_20
+        self.weekly_screen = weekly_screen
+    
+    @classmethod
+    def from_frame(cls, symbol, data, volume_ratio, volume_details, patterns, weekly_screen=None):
+        """Record for a detection on `data`, keeping only the latest bar's fields"""
+        latest = data.iloc[-1]
+        return cls(
+            symbol=symbol,
+            current_price=float(latest['Close']),
+            volume_ratio=float(volume_ratio),
+            volume_details={key: float(value) for key, value in volume_details.items()},
+            rsi=float(latest['RSI']),
+            adx=float(latest['ADX']),
+            trading_date=latest.name.strftime('%Y-%m-%d'),
+            day_open=float(latest['Open']),
+            day_high=float(latest['High']),
+            day_low=float(latest['Low']),
+            day_close=float(latest['Close']),
+            patterns=patterns,
+            sma_20=float(latest['SMA_20']),
+            ema_20=float(latest['EMA_20']),
+            weekly_screen=weekly_screen
+        )
+    
+    def with_enhancements(self, enhancements):
+        """Copy of this record carrying `enhancements`"""
+        fields = self.to_dict()
+        fields['enhancements'] = enhancements
+        return ScanResult(**fields)
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    @property
+    def max_strength(self):
+        return max(pattern['strength'] for pattern in self.patterns)
+
+# Optional stage-3 analyses, in the order they are run and shown
+ENHANCEMENT_KEYS = ('delivery_volume', 'fno_consolidation', 'breakout_pullback', 'enhanced_sr')
+
+# Filter settings under which detect_patterns reports every pattern its detectors find
+UNFILTERED_DETECTION_SETTINGS = {
+    'rsi_min': float('-inf'),
+    'rsi_max': float('inf'),
+    'adx_min': float('-inf'),
+    'ma_support': False,
+    'pattern_strength_min': float('-inf'),
+    'pattern_filters': {key: True for key in PATTERN_FILTER_DEFAULTS},
+    'pattern_priority': "All Patterns (Comprehensive)",
+}
+
+# =================== UNIVERSE SCREENING ===================
+
+def current_day_filter_mask(close, rsi, adx, sma_20, ema_20, filters):
+    """
+    RSI range, minimum ADX and MA-support checks on the latest bar. Accepts scalars or
+    per-symbol arrays; NaN values pass or fail exactly as the scalar comparisons do.
+    """
+    keep = np.logical_and(filters['rsi_min'] <= rsi, rsi <= filters['rsi_max'])
+    keep = np.logical_and(keep, np.logical_not(adx < filters['adx_min']))
+    if filters['ma_support']:
+        moving_average = sma_20 if filters['ma_type'] == 'SMA' else ema_20
+        keep = np.logical_and(keep, np.logical_not(close < moving_average * (1 - filters['ma_tolerance'] / 100)))
+    return keep
+
+def weekly_screen_values(weekly_data):
+    """Latest weekly close, RSI, ADX and 10-week SMA, with neutral stand-ins for missing indicators"""
+    latest = weekly_data.iloc[-1]
+    close = float(latest['Close'])
+    return {
+        'close': close,
+        'rsi': 50.0 if pd.isna(latest['RSI']) else float(latest['RSI']),
+        'adx': 20.0 if pd.isna(latest['ADX']) else float(latest['ADX']),
+        'sma_10': close if pd.isna(latest['SMA_10']) else float(latest['SMA_10']),
+    }
+
+def weekly_filter_passes(screen, filters):
+    """RSI range, minimum ADX and 10-week SMA support checks on weekly_screen_values()"""
+    if not (filters['rsi_min'] <= screen['rsi'] <= filters['rsi_max']):
+        return False
+    if screen['adx'] < filters['adx_min']:
+        return False
+    if filters['ma_support'] and screen['close'] < screen['sma_10'] * (1 - filters['ma_tolerance'] / 100):
+        return False
+    return True
+
+class IndicatorPanel:
+    """
+    Daily indicators for a whole universe in one vectorized pass. High/Low/Close are held
+    as bars x symbols arrays aligned on each symbol's latest bar, so the last row is every
+    symbol's current day and each column matches the per-symbol frame from get_stock_data.
+    Symbols with the same history length are computed together as one 2-D block.
+    """
+    
+    MIN_BARS = 20  # Same cut-off as get_stock_data
+    MIN_PATTERN_BARS = 30  # detect_patterns needs at least this many bars
+    VOLUME_AVERAGE_DAYS = 20  # check_volume_criteria compares against the prior 20 sessions
+    
+    def __init__(self, frames, compute=compute_daily_indicators):
+        frames = {symbol: frame for symbol, frame in frames.items()
+                  if frame is not None and len(frame) >= self.MIN_BARS}
+        self.symbols = list(frames)
+        self.lengths = np.array([len(frames[symbol]) for symbol in self.symbols], dtype=int)
+        depth = int(self.lengths.max()) if self.symbols else 0
+        
+        self.prices = {}
+        for column in ('High', 'Low', 'Close', 'Volume'):
+            panel = np.full((depth, len(self.symbols)), np.nan)
+            for j, symbol in enumerate(self.symbols):
+                panel[depth - self.lengths[j]:, j] = frames[symbol][column].to_numpy(dtype=float)
+            self.prices[column] = panel
+        
+        self.indicators = {}
+        for length in np.unique(self.lengths):
+            block = np.flatnonzero(self.lengths == length)
+            high, low, close = (self.prices[column][depth - length:, block] for column in ('High', 'Low', 'Close'))
+            for name, values in compute(high, low, close).items():
+                if name not in self.indicators:
+                    self.indicators[name] = np.full((depth, len(self.symbols)), np.nan)
+                self.indicators[name][depth - length:, block] = values
+    
+    def latest(self, name):
+        """Current-day value of a price or indicator column for every symbol"""
+        source = self.prices if name in self.prices else self.indicators
+        return source[name][-1]
+    
+    def volume_ratio(self):
+        """Current volume over the average of the prior 20 sessions (NaN volumes skipped, as in pandas)"""
+        prior = self.prices['Volume'][-(self.VOLUME_AVERAGE_DAYS + 1):-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            average = np.nansum(prior, axis=0) / np.sum(~np.isnan(prior), axis=0)
+            return self.latest('Volume') / average
+    
+    def prefilter_mask(self, filters):
+        """Boolean mask of symbols that pass the volume check and detect_patterns' current-day filters"""
+        if not self.symbols:
+            return np.zeros(0, dtype=bool)
+        keep = current_day_filter_mask(
+            self.latest('Close'), self.latest('RSI'), self.latest('ADX'),
+            self.latest('SMA_20'), self.latest('EMA_20'), filters
+        )
+        keep = np.logical_and(keep, self.volume_ratio() >= filters['min_volume_ratio'])
+        return np.logical_and(keep, self.lengths >= self.MIN_PATTERN_BARS)
+    
+    def prefilter(self, filters):
+        """Symbols that survive the current-day filters, in panel order"""
+        mask = self.prefilter_mask(filters)
+        return [symbol for symbol, keep in zip(self.symbols, mask) if keep]
+
 class ProfessionalPCSScanner:
-    def __init__(self):
+    def __init__(self, store=None, caches=None):
         self.ist = pytz.timezone('Asia/Kolkata')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        
+        # Local OHLCV store consulted before any download
+        self.store = store if store is not None else OHLCVStore()
+        
+        # Loaded universe OHLCV: (symbol, trading date) -> (period, frame); frame is None when no data exists.
+        # Pass get_scan_caches() to share prices and indicator frames across scans and reruns.
+        caches = caches if caches is not None else {}
+        self._price_history = caches.get('prices')
+        if self._price_history is None:
+            self._price_history = TTLCache(PRICE_CACHE_MAX_ENTRIES)
+        self._indicator_cache = caches.get('indicators')
+        if self._indicator_cache is None:
+            self._indicator_cache = TTLCache(INDICATOR_CACHE_MAX_ENTRIES)
+        
+        # Unfiltered detections and enhancement outputs, so threshold changes only re-filter
+        self._detection_cache = caches.get('detections')
+        if self._detection_cache is None:
+            self._detection_cache = TTLCache(DETECTION_CACHE_MAX_ENTRIES, ttl=DETECTION_CACHE_TTL_SECONDS)
+        self._enhancement_cache = caches.get('enhancements')
+        if self._enhancement_cache is None:
+            self._enhancement_cache = TTLCache(ENHANCEMENT_CACHE_MAX_ENTRIES)
+        
+        # Reported delivery figures from ingested NSE bhavcopies
+        self.delivery_store = caches.get('delivery')
+        if self.delivery_store is None:
+            self.delivery_store = DeliveryStore()
+        
+        # Derived features memoized per frame object: id(frame) -> (weakref to frame, {feature key: value})
+        self._frame_feature_store = {}
+        self._frame_feature_lock = threading.Lock()
+    
+    # =================== BATCHED OHLCV ACQUISITION ===================
+    
+    def prefetch_price_history(self, symbols, period=HISTORY_PERIOD, batch_size=DEFAULT_DOWNLOAD_BATCH_SIZE, progress_callback=None):
+        """
+        Load daily OHLCV for the whole universe. The local store is read first; only
+        missing symbols and bars newer than the last stored date are downloaded, using
+        a few multi-ticker requests. Frames are kept in memory and served by get_stock_data.
+        """
+        symbols = [s for s in dict.fromkeys(symbols) if not self._has_price_history(s, period)]
+        
+        stored_frames = {}
+        full_downloads = []
+        top_ups = {}  # Last stored date -> symbols that need bars from that date onward
+        for symbol in symbols:
+            stored = self.store.load(symbol)
+            if not self.store.covers(symbol, stored, period):
+                full_downloads.append(symbol)
+            elif self.store.is_fresh(symbol):
+                self._remember_history(symbol, period, stored)
+            else:
+                stored_frames[symbol] = stored
+                top_ups.setdefault(self.store.top_up_start(stored), []).append(symbol)
+        
+        batch_size = max(1, int(batch_size))
+        readjusted = []
+        jobs = [(full_downloads[i:i + batch_size], None) for i in range(0, len(full_downloads), batch_size)]
+        for start, group in sorted(top_ups.items()):
+            jobs.extend((group[i:i + batch_size], start) for i in range(0, len(group), batch_size))
+        
+        for job_index, (batch, start) in enumerate(jobs):
+            if progress_callback:
+                progress_callback(job_index + 1, len(jobs), batch)
+            
+            frames = self._download_ohlcv_batch(batch, period, start=start)
+            if frames is None:
+                continue  # Whole batch failed - get_stock_data falls back to per-symbol requests
+            
+            for symbol in batch:
+                if symbol not in frames and symbol not in stored_frames:
+                    continue  # Missing from the response - not cached, so get_stock_data retries it on its own
+                if symbol not in stored_frames:
+                    self._remember_history(symbol, period, self.store.save_full_history(symbol, frames[symbol], period))
+                    continue
+                if self.store.adjustment_changed(stored_frames[symbol], frames.get(symbol)):
+                    readjusted.append(symbol)
+                    continue
+                merged = self.store.append(symbol, stored_frames[symbol], frames.get(symbol))
+                self._remember_history(symbol, period, merged)
+        
+        # Re-adjusted histories are replaced with a full download rather than mixed with the stored bars
+        for i in range(0, len(readjusted), batch_size):
+            batch = readjusted[i:i + batch_size]
+            frames = self._download_ohlcv_batch(batch, period) or {}
+            for symbol in batch:
+                if symbol in frames:
+                    self._remember_history(symbol, period, self.store.save_full_history(symbol, frames[symbol], period))
+        
+        return len(jobs)
+    
+    def _download_ohlcv_batch(self, symbols, period, start=None):
+        """Fetch one chunk of symbols in a single request and split it into per-symbol frames"""
+        try:
+            if start is not None:
+                # Incremental top-up from top_up_start: the last stored bar may have been partial
+                range_args = {'start': start.strftime('%Y-%m-%d')}
+            else:
+                range_args = {'period': period}
+            
+            raw = yf.download(
+                symbols,
+                interval="1d",
+                group_by='ticker',
+                auto_adjust=True,
+                threads=True,
+                progress=False,
+                **range_args
+            )
+        except Exception:
+            return None
+        
+        if raw is None or raw.empty:
+            return None
+        
+        frames = {}
+        for symbol in symbols:
+            try:
+                if isinstance(raw.columns, pd.MultiIndex):
+                    if symbol not in raw.columns.get_level_values(0):
+                        continue
+                    frame = raw[symbol]
+                else:
+                    frame = raw  # Single-ticker download without a ticker level
+                
+                frame = normalize_ohlcv_frame(frame)
+                if frame is not None:
+                    frames[symbol] = frame
+            except Exception:
+                continue
+        
+        return frames
+    
+    def _price_key(self, symbol):
+        return (symbol, get_trading_date())
+    
+    def _remember_history(self, symbol, period, frame):
+        self._price_history.set(self._price_key(symbol), (period, frame))
+    
+    def _has_price_history(self, symbol, period):
+        cached = self._price_history.get(self._price_key(symbol))
+        return cached is not None and PERIOD_MONTHS.get(cached[0], 0) >= PERIOD_MONTHS.get(period, 99)
+    
+    def _load_symbol_history(self, symbol, period):
+        """Single-symbol path: serve the local store, topping it up with newer bars if stale"""
+        stored = self.store.load(symbol)
+        stock = yf.Ticker(symbol)
+        
+        if self.store.covers(symbol, stored, period):
+            if self.store.is_fresh(symbol):
+                return stored
+            new_bars = stock.history(start=self.store.top_up_start(stored).strftime('%Y-%m-%d'), interval="1d")
+            if not self.store.adjustment_changed(stored, new_bars):
+                return self.store.append(symbol, stored, new_bars)
+            # Split or dividend re-adjustment: replace the history
+        
+        return self.store.save_full_history(symbol, stock.history(period=period, interval="1d"), period)
+    
+    def _get_price_history(self, symbol, period):
+        """Return daily OHLCV for `period`, served from the loaded universe when available"""
+        cached = self._price_history.get(self._price_key(symbol))
+        
+        if cached is None or PERIOD_MONTHS.get(cached[0], 0) < PERIOD_MONTHS.get(period, 99):
+            # One load per symbol, long enough for both the daily and weekly timeframes
+            fetch_period = period if PERIOD_MONTHS.get(period, 99) > PERIOD_MONTHS[HISTORY_PERIOD] else HISTORY_PERIOD
+            cached = (fetch_period, self._load_symbol_history(symbol, fetch_period))
+            self._remember_history(symbol, *cached)
+        
+        frame = cached[1]
+        if frame is None:
+            return None
+        start = frame.index[-1] - pd.DateOffset(months=PERIOD_MONTHS[period])
+        return frame[frame.index > start].copy()
+    
+    def build_indicator_panel(self, symbols, period="3mo", compute=compute_daily_indicators):
+        """IndicatorPanel over the same per-symbol windows get_stock_data uses"""
+        return IndicatorPanel({symbol: self._get_price_history(symbol, period) for symbol in symbols}, compute)
+    
+    def screen_symbols(self, symbols, config):
+        """
+        Stage 1: symbols passing the volume, RSI, ADX and MA-support checks, from minimal panel features.
+        Only histories already in memory are screened; symbols whose batch download failed pass through
+        unscreened, so stage 2 fetches them on the worker pool instead of one by one here.
+        """
+        loaded = self.loaded_symbols(symbols)
+        passing = set(self.build_indicator_panel(loaded, compute=compute_screen_indicators).prefilter(config))
+        loaded = set(loaded)
+        return [symbol for symbol in symbols if symbol in passing or symbol not in loaded]
+    
+    def loaded_symbols(self, symbols):
+        """Symbols whose price history is already held in memory"""
+        return [symbol for symbol in symbols
+                if self._price_history.get(self._price_key(symbol), (None, None))[1] is not None]
     
     def get_stock_data(self, symbol, period="3mo"):
         """Get stock data with focus on recent data for current trading day analysis"""
         try:
-            stock = yf.Ticker(symbol)
-            data = stock.history(period=period, interval="1d")
+            data = self._get_price_history(symbol, period)
             
-            if len(data) < 20:
+            if data is None or len(data) < 20:
                 return None
             
-            # Calculate technical indicators
-            data['RSI'] = ta.momentum.RSIIndicator(data['Close']).rsi()
-            data['SMA_20'] = ta.trend.SMAIndicator(data['Close'], window=20).sma_indicator()
-            data['SMA_50'] = ta.trend.SMAIndicator(data['Close'], window=50).sma_indicator()
-            data['EMA_20'] = ta.trend.EMAIndicator(data['Close'], window=20).ema_indicator()
-            data['BB_upper'] = ta.volatility.BollingerBands(data['Close']).bollinger_hband()
-            data['BB_lower'] = ta.volatility.BollingerBands(data['Close']).bollinger_lband()
-            data['BB_middle'] = ta.volatility.BollingerBands(data['Close']).bollinger_mavg()
-            data['MACD'] = ta.trend.MACD(data['Close']).macd()
-            data['MACD_signal'] = ta.trend.MACD(data['Close']).macd_signal()
-            data['MACD_hist'] = ta.trend.MACD(data['Close']).macd_diff()
-            data['ADX'] = ta.trend.ADXIndicator(data['High'], data['Low'], data['Close']).adx()
-            data['ATR'] = ta.volatility.AverageTrueRange(data['High'], data['Low'], data['Close']).average_true_range()
-            data['Stoch_K'] = ta.momentum.StochasticOscillator(data['High'], data['Low'], data['Close']).stoch()
-            data['Williams_R'] = ta.momentum.WilliamsRIndicator(data['High'], data['Low'], data['Close']).williams_r()
+            # Indicator frames are cached per symbol, period and latest bar (trading date + close)
+            cache_key = ('daily', symbol, period, data.index[-1], data['Close'].iloc[-1], len(data))
+            cached = self._indicator_cache.get(cache_key)
+            if cached is not None:
+                return cached.copy()
+            
+            # Calculate technical indicators in one vectorized pass
+            add_indicator_columns(data, compute_daily_indicators)
+            self._indicator_cache.set(cache_key, data.copy())
             
             return data
         except Exception as e:
             return None
     
-    def get_weekly_stock_data(self, symbol, period="6mo"):
+    def get_weekly_stock_data(self, symbol, period=WEEKLY_DATA_PERIOD):
         """Get weekly stock data for pattern validation"""
         try:
-            stock = yf.Ticker(symbol)
-            # Get more data for weekly analysis, then resample to weekly
-            daily_data = stock.history(period=period, interval="1d")
+            # Reuse the per-symbol daily history already fetched for the daily frame
+            daily_data = self._get_price_history(symbol, period)
             
-            if len(daily_data) < 50:  # Need sufficient data for weekly analysis
+            if daily_data is None or len(daily_data) < 50:  # Need sufficient data for weekly analysis
                 return None
             
+            cache_key = ('weekly', symbol, period, daily_data.index[-1], daily_data['Close'].iloc[-1], len(daily_data))
+            cached = self._indicator_cache.get(cache_key)
+            if cached is not None:
+                return cached.copy()
+            
             # Resample daily data to weekly (Friday close)
             weekly_data = daily_data.resample('W-FRI').agg({
                 'Open': 'first',
@@ -994,14 +2435,8 @@ class ProfessionalPCSScanner:
                 return None
             
             # Calculate weekly technical indicators
-            weekly_data['RSI'] = ta.momentum.RSIIndicator(weekly_data['Close']).rsi()
-            weekly_data['SMA_10'] = ta.trend.SMAIndicator(weekly_data['Close'], window=10).sma_indicator()
-            weekly_data['SMA_20'] = ta.trend.SMAIndicator(weekly_data['Close'], window=20).sma_indicator()
-            weekly_data['EMA_10'] = ta.trend.EMAIndicator(weekly_data['Close'], window=10).ema_indicator()
-            weekly_data['MACD'] = ta.trend.MACD(weekly_data['Close']).macd()
-            weekly_data['MACD_signal'] = ta.trend.MACD(weekly_data['Close']).macd_signal()
-            weekly_data['MACD_hist'] = ta.trend.MACD(weekly_data['Close']).macd_diff()
-            weekly_data['ADX'] = ta.trend.ADXIndicator(weekly_data['High'], weekly_data['Low'], weekly_data['Close']).adx()
+            add_indicator_columns(weekly_data, compute_weekly_indicators)
+            self._indicator_cache.set(cache_key, weekly_data.copy())
             
             return weekly_data
         except Exception as e:
@@ -1017,6 +2452,56 @@ class ProfessionalPCSScanner:
                 'weekly_context': 'Insufficient weekly data'
             }
         
+        # Trend, RSI, MACD, ADX, support/resistance and volume signals are shared by every pattern
+        context = self.get_weekly_context(weekly_data)
+        if 'error' in context:
+            return {
+                'weekly_validation': False,
+                'weekly_strength_bonus': 0,
+                'weekly_signals': [],
+                'weekly_context': context['error']
+            }
+        
+        weekly_signals = list(context['signals'])
+        strength_bonus = context['bonus']
+        
+        # 7. Pattern-Specific Weekly Validation
+        pattern_bonus = self._get_pattern_specific_weekly_bonus(pattern_type, weekly_data)
+        if pattern_bonus['bonus'] > 0:
+            weekly_signals.append(pattern_bonus['context'])
+            strength_bonus += pattern_bonus['bonus']
+        
+        # Determine overall weekly validation
+        weekly_validation = len(weekly_signals) >= 2 and strength_bonus >= 15
+        
+        # Context summary
+        if strength_bonus >= 35:
+            weekly_context = "Exceptionally strong weekly confirmation"
+        elif strength_bonus >= 25:
+            weekly_context = "Strong weekly alignment"
+        elif strength_bonus >= 15:
+            weekly_context = "Moderate weekly support"
+        else:
+            weekly_context = "Weak weekly confirmation"
+        
+        return {
+            'weekly_validation': weekly_validation,
+            'weekly_strength_bonus': strength_bonus,
+            'weekly_signals': weekly_signals,
+            'weekly_context': weekly_context,
+            'weekly_rsi': context['weekly_rsi'],
+            'weekly_trend': context['weekly_trend']
+        }
+    
+    def get_weekly_context(self, weekly_data):
+        """Pattern-independent weekly signals for one weekly frame, computed once per frame"""
+        features = self._frame_features(weekly_data)
+        if 'weekly_context' not in features:
+            features['weekly_context'] = self._compute_weekly_context(weekly_data)
+        return features['weekly_context']
+    
+    def _compute_weekly_context(self, weekly_data):
+        """Weekly trend, RSI, MACD, ADX, support/resistance and volume signals with their combined bonus"""
         try:
             # Get current weekly metrics
             current_weekly_close = weekly_data['Close'].iloc[-1]
@@ -1077,41 +2562,15 @@ class ProfessionalPCSScanner:
                 weekly_signals.append(weekly_volume_trend['context'])
                 strength_bonus += weekly_volume_trend['bonus']
             
-            # 7. Pattern-Specific Weekly Validation
-            pattern_bonus = self._get_pattern_specific_weekly_bonus(pattern_type, weekly_data)
-            if pattern_bonus['bonus'] > 0:
-                weekly_signals.append(pattern_bonus['context'])
-                strength_bonus += pattern_bonus['bonus']
-            
-            # Determine overall weekly validation
-            weekly_validation = len(weekly_signals) >= 2 and strength_bonus >= 15
-            
-            # Context summary
-            if strength_bonus >= 35:
-                weekly_context = "Exceptionally strong weekly confirmation"
-            elif strength_bonus >= 25:
-                weekly_context = "Strong weekly alignment"
-            elif strength_bonus >= 15:
-                weekly_context = "Moderate weekly support"
-            else:
-                weekly_context = "Weak weekly confirmation"
-            
             return {
-                'weekly_validation': weekly_validation,
-                'weekly_strength_bonus': strength_bonus,
-                'weekly_signals': weekly_signals,
-                'weekly_context': weekly_context,
+                'signals': weekly_signals,
+                'bonus': strength_bonus,
                 'weekly_rsi': current_weekly_rsi,
                 'weekly_trend': 'Bullish' if current_weekly_close > weekly_sma_10 else 'Neutral/Bearish'
             }
             
         except Exception as e:
-            return {
-                'weekly_validation': False,
-                'weekly_strength_bonus': 0,
-                'weekly_signals': [],
-                'weekly_context': f'Weekly analysis error: {str(e)}'
-            }
+            return {'error': f'Weekly analysis error: {str(e)}'}
     
     def _analyze_weekly_support_resistance(self, weekly_data):
         """Analyze weekly support/resistance levels"""
@@ -1212,10 +2671,11 @@ class ProfessionalPCSScanner:
         if len(data) < 21:
             return False, 0, {}
         
-        current_volume = data['Volume'].iloc[-1]
-        avg_5_volume = data['Volume'].tail(6).iloc[:-1].mean()  # Exclude current day
-        avg_10_volume = data['Volume'].tail(11).iloc[:-1].mean()
-        avg_20_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        features = self.get_bar_features(data)
+        current_volume = features.last_volume
+        avg_5_volume = features.avg_volume[5]  # Exclude current day
+        avg_10_volume = features.avg_volume[10]
+        avg_20_volume = features.avg_volume[20]
         
         volume_ratio_20 = current_volume / avg_20_volume
         volume_ratio_10 = current_volume / avg_10_volume
@@ -1247,6 +2707,7 @@ class ProfessionalPCSScanner:
             ]
             
             news_items = []
+            failed_queries = 0
             
             for query in search_queries[:2]:  # Limit for speed
                 try:
@@ -1254,7 +2715,9 @@ class ProfessionalPCSScanner:
                     search_url = f"https://www.google.com/search?q={query}&tbm=nws&tbs=qdr:d"
                     
                     response = self.session.get(search_url, timeout=3)
-                    if response.status_code == 200:
+                    if response.status_code != 200:
+                        failed_queries += 1
+                    else:
                         soup = BeautifulSoup(response.content, 'html.parser')
                         
                         # Extract news headlines
@@ -1263,29 +2726,21 @@ class ProfessionalPCSScanner:
                         for element in news_elements:
                             headline = element.get_text().strip()
                             if len(headline) > 20:
+                                relevance, sentiment = NEWS_KEYWORD_MATCHER.score(headline)
                                 news_items.append({
                                     'headline': headline,
-                                    'relevance': self._assess_news_relevance(headline),
+                                    'relevance': relevance,
+                                    'sentiment_score': sentiment,
                                     'source': 'Recent News'
                                 })
                                 
                 except Exception:
+                    failed_queries += 1
                     continue
             
-            # Assess sentiment
+            # Assess sentiment (scored per headline by the keyword matcher)
             if news_items:
-                positive_keywords = ['order', 'win', 'contract', 'growth', 'profit', 'beat', 'strong', 'positive', 'approval']
-                negative_keywords = ['loss', 'decline', 'weak', 'concern', 'fall', 'drop', 'negative', 'warning']
-                
-                sentiment_score = 0
-                for item in news_items:
-                    headline_lower = item['headline'].lower()
-                    for word in positive_keywords:
-                        if word in headline_lower:
-                            sentiment_score += 1
-                    for word in negative_keywords:
-                        if word in headline_lower:
-                            sentiment_score -= 1
+                sentiment_score = sum(item['sentiment_score'] for item in news_items)
                 
                 overall_sentiment = 'positive' if sentiment_score > 0 else 'negative' if sentiment_score < 0 else 'neutral'
             else:
@@ -1294,32 +2749,21 @@ class ProfessionalPCSScanner:
             return {
                 'news_items': news_items[:2],
                 'overall_sentiment': overall_sentiment,
-                'news_count': len(news_items)
+                'news_count': len(news_items),
+                'lookup_failed': failed_queries == len(search_queries[:2])  # No query got through, so no news is unknown
             }
             
         except Exception as e:
             return {
                 'news_items': [],
                 'overall_sentiment': 'neutral', 
-                'news_count': 0
+                'news_count': 0,
+                'lookup_failed': True
             }
     
     def _assess_news_relevance(self, headline):
         """Assess how relevant news is to volume/price movement"""
-        high_relevance_keywords = ['order', 'contract', 'earnings', 'results', 'approval', 'launch', 'merger']
-        medium_relevance_keywords = ['growth', 'expansion', 'investment', 'partnership', 'policy']
-        
-        headline_lower = headline.lower()
-        
-        for word in high_relevance_keywords:
-            if word in headline_lower:
-                return 'high'
-        
-        for word in medium_relevance_keywords:
-            if word in headline_lower:
-                return 'medium'
-        
-        return 'low'
+        return NEWS_KEYWORD_MATCHER.score(headline)[0]
     
     def detect_current_day_breakout(self, data, lookback_days=20, min_volume_ratio=2.0):
         """
@@ -1330,26 +2774,23 @@ class ProfessionalPCSScanner:
             return False, 0, {}
         
         # Get current day (latest) data
-        current_day = data.iloc[-1]
-        
-        # Get lookback period (excluding current day)
-        lookback_data = data.iloc[-(lookback_days + 1):-1]
+        features = self.get_bar_features(data)
         
-        # Calculate resistance level from lookback period
-        resistance_level = lookback_data['High'].max()
-        support_level = lookback_data['Low'].min()
+        # Calculate resistance level from lookback period (excluding current day)
+        resistance_level = features.high_max(lookback_days + 1, stop=-1)
+        support_level = features.low_min(lookback_days + 1, stop=-1)
         
         # Check if current day broke above resistance
-        current_high = current_day['High']
-        current_close = current_day['Close']
-        current_volume = current_day['Volume']
+        current_high = features.last_high
+        current_close = features.last_close
+        current_volume = features.last_volume
         
         # Breakout conditions - ALL MUST BE FROM CURRENT DAY
         price_breakout = current_close > resistance_level * 1.005  # 0.5% above resistance
         high_breakout = current_high > resistance_level * 1.01     # 1% intraday breakout
         
         # Volume confirmation from current day
-        avg_volume = lookback_data['Volume'].mean()
+        avg_volume = features.volume_mean(lookback_days + 1, stop=-1)
         volume_breakout = current_volume > (avg_volume * min_volume_ratio)
         
         # Calculate consolidation quality
@@ -1394,14 +2835,14 @@ class ProfessionalPCSScanner:
             strength += 15
         
         # Current day close strength
-        close_strength = ((current_close - current_day['Low']) / (current_day['High'] - current_day['Low'])) * 100
+        close_strength = ((current_close - features.last_low) / (current_high - features.last_low)) * 100
         if close_strength >= 80:  # Closed in top 20% of day's range
             strength += 10
         elif close_strength >= 60:
             strength += 5
         
         details = {
-            'current_date': current_day.name.strftime('%Y-%m-%d'),
+            'current_date': features.index[-1].strftime('%Y-%m-%d'),
             'current_close': current_close,
             'current_high': current_high,
             'current_volume': current_volume,
@@ -1518,22 +2959,10 @@ class ProfessionalPCSScanner:
         sma_20 = data['SMA_20'].iloc[-1]
         ema_20 = data['EMA_20'].iloc[-1]
         
-        # Apply filters based on CURRENT DAY
-        if not (filters['rsi_min'] <= current_rsi <= filters['rsi_max']):
+        # Apply RSI/ADX/MA-support filters based on CURRENT DAY (shared with the panel pre-filter)
+        if not current_day_filter_mask(current_price, current_rsi, current_adx, sma_20, ema_20, filters):
             return patterns
         
-        if current_adx < filters['adx_min']:
-            return patterns
-        
-        # MA support check (current day)
-        if filters['ma_support']:
-            if filters['ma_type'] == 'SMA':
-                if current_price < sma_20 * (1 - filters['ma_tolerance']/100):
-                    return patterns
-            else:  # EMA
-                if current_price < ema_20 * (1 - filters['ma_tolerance']/100):
-                    return patterns
-        
         # Get pattern filters if available
         pattern_filters = filters.get('pattern_filters', {})
         pattern_priority = filters.get('pattern_priority', 'All Patterns (Comprehensive)')
@@ -1561,6 +2990,7 @@ class ProfessionalPCSScanner:
             weekly_data = None
         
         # PRIORITY 1: Current Day Breakout Detection
+        breakout_detected = False
         if pattern_filters.get('current_day_breakout', True):
             breakout_detected, breakout_strength, breakout_details = self.detect_current_day_breakout(
                 data, 
@@ -1568,305 +2998,72 @@ class ProfessionalPCSScanner:
                 min_volume_ratio=filters.get('volume_breakout_ratio', 2.0)
             )
             
-            if breakout_detected and breakout_strength >= filters['pattern_strength_min']:
-                # Handle weekly validation based on mode
-                if enable_weekly_validation and weekly_data is not None:
-                    weekly_validation = self.validate_weekly_strength(data, weekly_data, 'Current Day Breakout')
-                    final_strength = breakout_strength + weekly_validation['weekly_strength_bonus']
-                    
-                    pattern_data = {
-                        'type': 'Current Day Breakout',
-                        'strength': final_strength,
-                        'daily_strength': breakout_strength,
-                        'success_rate': 92,
-                        'research_basis': 'Real-time EOD Breakout Confirmation',
-                        'pcs_suitability': 98,
-                        'confidence': self.get_confidence_level(final_strength),
-                        'details': breakout_details,
-                        'special': 'CURRENT_DAY_BREAKOUT',
-                        'weekly_validation': weekly_validation,
-                        'timeframe': 'Daily + Weekly'
-                    }
-                else:
-                    # Daily only mode
-                    pattern_data = {
-                        'type': 'Current Day Breakout',
-                        'strength': breakout_strength,
-                        'success_rate': 92,
-                        'research_basis': 'Real-time EOD Breakout Confirmation',
-                        'pcs_suitability': 98,
-                        'confidence': self.get_confidence_level(breakout_strength),
-                        'details': breakout_details,
-                        'special': 'CURRENT_DAY_BREAKOUT',
-                        'timeframe': 'Daily Only'
-                    }
-                
-                # Apply priority filters
-                if self._meets_priority_criteria(pattern_data, pattern_priority):
-                    patterns.append(pattern_data)
-        else:
-            breakout_detected = False
+            if (breakout_detected and breakout_strength >= filters['pattern_strength_min']
+                    and self._meets_priority_criteria(CURRENT_DAY_BREAKOUT_PATTERN, pattern_priority)):
+                patterns.append(self._build_pattern_result(
+                    CURRENT_DAY_BREAKOUT_PATTERN, breakout_strength, data, weekly_data,
+                    details=breakout_details, special='CURRENT_DAY_BREAKOUT'
+                ))
         
-        # PRIORITY 2: Traditional patterns (if no current day breakout or if filters allow multiple patterns)
+        # PRIORITY 2: Registry patterns (if no current day breakout or if filters allow multiple patterns)
         if not breakout_detected or len([k for k, v in pattern_filters.items() if v]) > 1:
-            # Cup and Handle (must be confirmed by current day)
-            if pattern_filters.get('cup_and_handle', True):
-                cup_detected, cup_strength = self.detect_cup_and_handle_current(data)
-                if cup_detected and cup_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Cup and Handle',
-                        'strength': cup_strength,
-                        'success_rate': 85,
-                        'research_basis': 'William O\'Neil - IBD (Current Day Confirmed)',
-                        'pcs_suitability': 95,
-                        'confidence': self.get_confidence_level(cup_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, cup_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Flat Base Breakout (current day confirmed)
-            if pattern_filters.get('flat_base', True):
-                flat_detected, flat_strength = self.detect_flat_base_current(data)
-                if flat_detected and flat_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Flat Base Breakout',
-                        'strength': flat_strength,
-                        'success_rate': 82,
-                        'research_basis': 'Mark Minervini - Current Day Confirmed',
-                        'pcs_suitability': 92,
-                        'confidence': self.get_confidence_level(flat_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, flat_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # NEW PATTERNS ADDED - V6 Enhancement
-            
-            # Bump-and-Run Reversal (bottom)
-            if pattern_filters.get('bump_and_run', True):
-                bump_detected, bump_strength = self.detect_bump_and_run_reversal_bottom(data)
-                if bump_detected and bump_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Bump-and-Run Reversal (Bottom)',
-                        'strength': bump_strength,
-                        'success_rate': 78,
-                        'research_basis': 'Thomas Bulkowski - Encyclopedia of Chart Patterns',
-                        'pcs_suitability': 88,
-                        'confidence': self.get_confidence_level(bump_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, bump_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Rectangle Bottom
-            if pattern_filters.get('rectangle_bottom', True):
-                rect_bottom_detected, rect_bottom_strength = self.detect_rectangle_bottom(data)
-                if rect_bottom_detected and rect_bottom_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Rectangle Bottom',
-                        'strength': rect_bottom_strength,
-                        'success_rate': 75,
-                        'research_basis': 'Classical Technical Analysis - Rectangle Patterns',
-                        'pcs_suitability': 90,
-                        'confidence': self.get_confidence_level(rect_bottom_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, rect_bottom_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Rectangle Top
-            if pattern_filters.get('rectangle_top', False):
-                rect_top_detected, rect_top_strength = self.detect_rectangle_top(data)
-                if rect_top_detected and rect_top_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Rectangle Top',
-                        'strength': rect_top_strength,
-                        'success_rate': 72,
-                        'research_basis': 'Support Test After Rectangle Formation',
-                        'pcs_suitability': 85,
-                        'confidence': self.get_confidence_level(rect_top_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, rect_top_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Head-and-Shoulders Bottom
-            if pattern_filters.get('head_shoulders_bottom', True):
-                hs_bottom_detected, hs_bottom_strength = self.detect_head_and_shoulders_bottom(data)
-                if hs_bottom_detected and hs_bottom_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Head-and-Shoulders Bottom',
-                        'strength': hs_bottom_strength,
-                        'success_rate': 83,
-                        'research_basis': 'Classic Reversal Pattern - Edwards & Magee',
-                        'pcs_suitability': 93,
-                        'confidence': self.get_confidence_level(hs_bottom_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, hs_bottom_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Double Bottom (Eve & Eve)
-            if pattern_filters.get('double_bottom', True):
-                double_bottom_detected, double_bottom_strength = self.detect_double_bottom(data)
-                if double_bottom_detected and double_bottom_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Double Bottom (Eve & Eve)',
-                        'strength': double_bottom_strength,
-                        'success_rate': 80,
-                        'research_basis': 'Thomas Bulkowski - Double Bottom Analysis',
-                        'pcs_suitability': 91,
-                        'confidence': self.get_confidence_level(double_bottom_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, double_bottom_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Three Rising Valleys
-            if pattern_filters.get('three_rising_valleys', True):
-                three_valleys_detected, three_valleys_strength = self.detect_three_rising_valleys(data)
-                if three_valleys_detected and three_valleys_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Three Rising Valleys',
-                        'strength': three_valleys_strength,
-                        'success_rate': 77,
-                        'research_basis': 'Progressive Support Levels - Bullish Continuation',
-                        'pcs_suitability': 89,
-                        'confidence': self.get_confidence_level(three_valleys_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, three_valleys_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Rounding Bottom
-            if pattern_filters.get('rounding_bottom', True):
-                rounding_bottom_detected, rounding_bottom_strength = self.detect_rounding_bottom(data)
-                if rounding_bottom_detected and rounding_bottom_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Rounding Bottom',
-                        'strength': rounding_bottom_strength,
-                        'success_rate': 74,
-                        'research_basis': 'Saucer Pattern - Gradual Accumulation Phase',
-                        'pcs_suitability': 87,
-                        'confidence': self.get_confidence_level(rounding_bottom_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, rounding_bottom_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Rounding Top (upside breaks)
-            if pattern_filters.get('rounding_top_upside', False):
-                rounding_top_detected, rounding_top_strength = self.detect_rounding_top_upside_break(data)
-                if rounding_top_detected and rounding_top_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Rounding Top (Upside Break)',
-                        'strength': rounding_top_strength,
-                        'success_rate': 68,
-                        'research_basis': 'Rare Counter-Trend Breakout Pattern',
-                        'pcs_suitability': 85,
-                        'confidence': self.get_confidence_level(rounding_top_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, rounding_top_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
-            
-            # Inverted/Descending Scallop
-            if pattern_filters.get('inverted_scallop', True):
-                scallop_detected, scallop_strength = self.detect_inverted_scallop(data)
-                if scallop_detected and scallop_strength >= filters['pattern_strength_min']:
-                    pattern_data = {
-                        'type': 'Inverted/Descending Scallop',
-                        'strength': scallop_strength,
-                        'success_rate': 76,
-                        'research_basis': 'William O\'Neil - CAN SLIM Methodology',
-                        'pcs_suitability': 88,
-                        'confidence': self.get_confidence_level(scallop_strength)
-                    }
-                    # Handle weekly validation based on mode
-                    if enable_weekly_validation and weekly_data is not None:
-                        pattern_data = self._add_weekly_validation_to_pattern(pattern_data, scallop_strength, data, weekly_data)
-                        pattern_data['timeframe'] = 'Daily + Weekly'
-                    else:
-                        pattern_data['timeframe'] = 'Daily Only'
-                    if self._meets_priority_criteria(pattern_data, pattern_priority):
-                        patterns.append(pattern_data)
+            # Disabled and priority-excluded patterns are skipped before their detector runs;
+            # the rest are evaluated cheapest-first and reported in registry order
+            detected_patterns = {}
+            for position in DAILY_PATTERNS_BY_COST:
+                spec = DAILY_PATTERN_REGISTRY[position]
+                if not pattern_filters.get(spec['key'], spec['default']):
+                    continue
+                if not self._meets_priority_criteria(spec, pattern_priority):
+                    continue
+                detected, strength = getattr(self, spec['detector'])(data)
+                if detected and strength >= filters['pattern_strength_min']:
+                    detected_patterns[position] = self._build_pattern_result(spec, strength, data, weekly_data)
+            patterns.extend(detected_patterns[position] for position in sorted(detected_patterns))
         
         return patterns
     
+    def _build_pattern_result(self, spec, strength, data, weekly_data, **extra):
+        """Pattern result for a registry spec, with weekly validation when weekly data is available"""
+        pattern_data = {
+            'key': spec['key'],
+            'type': spec['name'],
+            'strength': strength,
+            'success_rate': spec['success_rate'],
+            'research_basis': spec['research_basis'],
+            'pcs_suitability': spec['pcs_suitability'],
+            'confidence': self.get_confidence_level(strength),
+            **extra
+        }
+        if weekly_data is not None:
+            pattern_data = self._add_weekly_validation_to_pattern(pattern_data, strength, data, weekly_data)
+            pattern_data['timeframe'] = 'Daily + Weekly'
+        else:
+            pattern_data['timeframe'] = 'Daily Only'
+        return pattern_data
+    
     def detect_cup_and_handle_current(self, data):
         """Cup and Handle pattern with CURRENT DAY confirmation"""
         if len(data) < 40:
             return False, 0
         
         # Pattern must be confirmed by current day breakout
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        features = self.get_bar_features(data)
+        current_price = features.last_close
+        current_volume = features.last_volume
         
-        # Look for cup formation in recent data
-        recent_data = data.tail(30)
-        cup_high = recent_data['High'].iloc[:20].max()
-        cup_low = recent_data['Low'].iloc[5:15].min()
+        # Look for cup formation in recent data (last 30 days)
+        cup_high = features.high_max(30, 0, 20)
+        cup_low = features.low_min(30, 5, 15)
         
         # Handle formation (last 10 days)
-        handle_data = recent_data.tail(10)
-        handle_high = handle_data['High'].max()
+        handle_high = features.high_max(10)
         
         # CURRENT DAY must break above handle/cup high
         current_day_breakout = current_price > handle_high * 1.005
         
         # Volume confirmation on current day
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_confirmed = current_volume > avg_volume * 1.5
         
         # Cup criteria
@@ -1889,22 +3086,21 @@ class ProfessionalPCSScanner:
             return False, 0
         
         # Base formation (last 15 days excluding current)
-        base_data = data.tail(16).iloc[:-1]
-        
-        high_price = base_data['High'].max()
-        low_price = base_data['Low'].min()
+        features = self.get_bar_features(data)
+        high_price = features.high_max(16, stop=-1)
+        low_price = features.low_min(16, stop=-1)
         price_range = ((high_price - low_price) / low_price) * 100
         
         tight_base = price_range < 12
         
         # CURRENT DAY breakout confirmation
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         breakout = current_price > high_price * 1.003
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_surge = current_volume > avg_volume * 1.8
         
         if not (tight_base and breakout and volume_surge):
@@ -1922,24 +3118,23 @@ class ProfessionalPCSScanner:
         if len(data) < 30:
             return False, 0
         
-        # Look for the pattern: decline, consolidation, then sharp reversal
-        recent_data = data.tail(30)
+        # Look for the pattern over the last 30 days: decline, consolidation, then sharp reversal
+        features = self.get_bar_features(data)
+        recent_close = features.close[-30:]
         
         # Phase 1: Initial decline (first 15 days)
-        decline_data = recent_data.iloc[:15]
-        decline_start = decline_data['Close'].iloc[0]
-        decline_end = decline_data['Close'].iloc[-1]
+        decline_start = recent_close[0]
+        decline_end = recent_close[14]
         decline_pct = ((decline_end - decline_start) / decline_start) * 100
         
         # Phase 2: Consolidation near bottom (next 10 days)
-        consolidation_data = recent_data.iloc[15:25]
-        consolidation_high = consolidation_data['High'].max()
-        consolidation_low = consolidation_data['Low'].min()
+        consolidation_high = features.high_max(30, 15, 25)
+        consolidation_low = features.low_min(30, 15, 25)
         consolidation_range = ((consolidation_high - consolidation_low) / consolidation_low) * 100
         
         # Phase 3: CURRENT DAY reversal
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         # Pattern criteria
         valid_decline = decline_pct < -8  # At least 8% decline
@@ -1947,7 +3142,7 @@ class ProfessionalPCSScanner:
         current_day_breakout = current_price > consolidation_high * 1.02  # 2% above consolidation high
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_surge = current_volume > avg_volume * 1.5
         
         if not (valid_decline and tight_consolidation and current_day_breakout and volume_surge):
@@ -1967,32 +3162,31 @@ class ProfessionalPCSScanner:
             return False, 0
         
         # Rectangle formation (last 20 days excluding current)
-        rect_data = data.tail(21).iloc[:-1]
+        features = self.get_bar_features(data)
+        rect_low = features.low[-21:-1]
+        rect_high = features.high[-21:-1]
         
         # Find support and resistance levels
-        support_level = rect_data['Low'].min()
-        resistance_level = rect_data['High'].max()
+        support_level = features.low_min(21, stop=-1)
+        resistance_level = features.high_max(21, stop=-1)
         
         # Rectangle criteria
         rect_height = ((resistance_level - support_level) / support_level) * 100
         valid_rectangle = 5 <= rect_height <= 15  # 5-15% height range for rectangle
         
         # Test if price stayed within rectangle bounds for most of the period
-        within_bounds = 0
-        for i in range(len(rect_data)):
-            if support_level <= rect_data['Low'].iloc[i] and rect_data['High'].iloc[i] <= resistance_level * 1.05:
-                within_bounds += 1
+        within_bounds = np.count_nonzero((support_level <= rect_low) & (rect_high <= resistance_level * 1.05))
         
-        formation_quality = within_bounds / len(rect_data) >= 0.7  # 70% of time within bounds
+        formation_quality = within_bounds / len(rect_low) >= 0.7  # 70% of time within bounds
         
         # CURRENT DAY breakout above resistance
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         breakout = current_price > resistance_level * 1.015  # 1.5% above resistance
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_confirmed = current_volume > avg_volume * 1.3
         
         if not (valid_rectangle and formation_quality and breakout and volume_confirmed):
@@ -2013,16 +3207,16 @@ class ProfessionalPCSScanner:
         
         # This pattern is typically bearish, but we'll look for bullish continuation after pullback
         # Rectangle formation followed by support hold
-        rect_data = data.tail(25).iloc[:-1]
+        features = self.get_bar_features(data)
         
-        # Find recent high and current support test
-        recent_high = rect_data.tail(15)['High'].max()
-        recent_low = rect_data.tail(10)['Low'].min()
+        # Find recent high and current support test (window excludes current day)
+        recent_high = features.high_max(16, stop=-1)
+        recent_low = features.low_min(11, stop=-1)
         
         # Look for pullback and current day bounce
-        current_price = data['Close'].iloc[-1]
-        current_low = data['Low'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_low = features.last_low
+        current_volume = features.last_volume
         
         # Pattern: pullback to support and bounce (bullish for PCS)
         pullback_depth = ((recent_high - recent_low) / recent_high) * 100
@@ -2030,7 +3224,7 @@ class ProfessionalPCSScanner:
         bounce_strength = ((current_price - current_low) / current_low) * 100
         
         # Volume on support test
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_support = current_volume > avg_volume * 1.2
         
         valid_pattern = 8 <= pullback_depth <= 20 and support_test and bounce_strength >= 1 and volume_support
@@ -2051,22 +3245,18 @@ class ProfessionalPCSScanner:
         if len(data) < 40:
             return False, 0
         
-        # Look for inverted H&S pattern in recent data
-        recent_data = data.tail(35)
-        
-        # Divide into sections: left shoulder, head, right shoulder
-        left_shoulder = recent_data.iloc[:10]
-        head_section = recent_data.iloc[10:25]
-        right_shoulder = recent_data.iloc[25:34]
+        # Look for inverted H&S pattern in the last 35 days, divided into
+        # left shoulder (0-10), head (10-25) and right shoulder (25-34)
+        features = self.get_bar_features(data)
         
         # Find key levels
-        left_low = left_shoulder['Low'].min()
-        head_low = head_section['Low'].min()
-        right_low = right_shoulder['Low'].min()
+        left_low = features.low_min(35, 0, 10)
+        head_low = features.low_min(35, 10, 25)
+        right_low = features.low_min(35, 25, 34)
         
         # Neckline (resistance level to break)
-        left_high = left_shoulder['High'].max()
-        right_high = right_shoulder['High'].max()
+        left_high = features.high_max(35, 0, 10)
+        right_high = features.high_max(35, 25, 34)
         neckline = (left_high + right_high) / 2
         
         # Pattern validation
@@ -2074,13 +3264,13 @@ class ProfessionalPCSScanner:
         shoulders_similar = abs(left_low - right_low) / min(left_low, right_low) < 0.15  # Shoulders similar height
         
         # CURRENT DAY neckline breakout
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         neckline_breakout = current_price > neckline * 1.01  # 1% above neckline
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_breakout = current_volume > avg_volume * 1.4
         
         if not (head_deeper and shoulders_similar and neckline_breakout and volume_breakout):
@@ -2099,35 +3289,31 @@ class ProfessionalPCSScanner:
         if len(data) < 30:
             return False, 0
         
-        # Look for two similar lows with a peak in between
-        recent_data = data.tail(30)
+        # Look for two similar lows with a peak in between (last 30 days)
+        features = self.get_bar_features(data)
         
         # Find potential double bottom
         # First bottom (days 5-12)
-        first_bottom_data = recent_data.iloc[5:12]
-        first_low = first_bottom_data['Low'].min()
-        first_low_idx = first_bottom_data['Low'].idxmin()
+        first_low = features.low_min(30, 5, 12)
         
         # Peak between bottoms (days 12-18)
-        peak_data = recent_data.iloc[12:18]
-        peak_high = peak_data['High'].max()
+        peak_high = features.high_max(30, 12, 18)
         
         # Second bottom (days 18-25)
-        second_bottom_data = recent_data.iloc[18:25]
-        second_low = second_bottom_data['Low'].min()
+        second_low = features.low_min(30, 18, 25)
         
         # Pattern validation
         bottoms_similar = abs(first_low - second_low) / min(first_low, second_low) < 0.08  # Within 8%
         significant_peak = ((peak_high - max(first_low, second_low)) / max(first_low, second_low)) * 100 > 5  # At least 5% peak
         
         # CURRENT DAY breakout above peak
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         breakout = current_price > peak_high * 1.015  # 1.5% above peak
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_confirmed = current_volume > avg_volume * 1.3
         
         if not (bottoms_similar and significant_peak and breakout and volume_confirmed):
@@ -2146,24 +3332,17 @@ class ProfessionalPCSScanner:
         if len(data) < 35:
             return False, 0
         
-        # Look for three consecutive higher lows
-        recent_data = data.tail(35)
-        
-        # Divide into three valley sections
-        valley1_data = recent_data.iloc[5:12]
-        valley2_data = recent_data.iloc[12:22]
-        valley3_data = recent_data.iloc[22:30]
+        # Look for three consecutive higher lows in the last 35 days
+        features = self.get_bar_features(data)
         
-        # Find valley lows
-        valley1_low = valley1_data['Low'].min()
-        valley2_low = valley2_data['Low'].min()
-        valley3_low = valley3_data['Low'].min()
+        # Find valley lows (days 5-12, 12-22, 22-30)
+        valley1_low = features.low_min(35, 5, 12)
+        valley2_low = features.low_min(35, 12, 22)
+        valley3_low = features.low_min(35, 22, 30)
         
         # Find peaks between valleys
-        peak1_data = recent_data.iloc[10:15]
-        peak2_data = recent_data.iloc[20:25]
-        peak1_high = peak1_data['High'].max()
-        peak2_high = peak2_data['High'].max()
+        peak1_high = features.high_max(35, 10, 15)
+        peak2_high = features.high_max(35, 20, 25)
         
         # Pattern validation - rising valleys
         rising_valleys = valley2_low > valley1_low * 1.02 and valley3_low > valley2_low * 1.02
@@ -2172,14 +3351,14 @@ class ProfessionalPCSScanner:
         rising_peaks = peak2_high >= peak1_high * 0.98
         
         # CURRENT DAY breakout above recent resistance
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         resistance_level = max(peak1_high, peak2_high)
         
         breakout = current_price > resistance_level * 1.01
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_surge = current_volume > avg_volume * 1.25
         
         if not (rising_valleys and rising_peaks and breakout and volume_surge):
@@ -2198,44 +3377,37 @@ class ProfessionalPCSScanner:
         if len(data) < 40:
             return False, 0
         
-        # Look for saucer/bowl shaped bottom
-        recent_data = data.tail(40)
-        
-        # Calculate moving averages to detect the rounding shape
-        ma_short = recent_data['Close'].rolling(window=5).mean()
-        ma_long = recent_data['Close'].rolling(window=15).mean()
+        # Look for saucer/bowl shaped bottom in the last 40 days
+        features = self.get_bar_features(data)
+        recent_close = features.close[-40:]
+        half = len(recent_close) // 2
         
         # Find the bottom of the rounding pattern
-        bottom_idx = recent_data['Low'].idxmin()
-        bottom_price = recent_data['Low'].min()
+        bottom_position = np.nanargmin(features.low[-40:]) / len(recent_close)
         
         # Check if bottom is roughly in the middle of the pattern
-        bottom_position = list(recent_data.index).index(bottom_idx) / len(recent_data)
         centered_bottom = 0.3 <= bottom_position <= 0.7
         
         # Check for gradual decline and rise (rounding shape)
-        first_half = recent_data.iloc[:len(recent_data)//2]
-        second_half = recent_data.iloc[len(recent_data)//2:]
-        
         # Gradual decline to bottom
-        decline_slope = (first_half['Close'].iloc[-1] - first_half['Close'].iloc[0]) / len(first_half)
+        decline_slope = (recent_close[half - 1] - recent_close[0]) / half
         
         # Gradual rise from bottom  
-        rise_slope = (second_half['Close'].iloc[-1] - second_half['Close'].iloc[0]) / len(second_half)
+        rise_slope = (recent_close[-1] - recent_close[half]) / (len(recent_close) - half)
         
         smooth_pattern = decline_slope < 0 and rise_slope > 0
         
         # CURRENT DAY breakout
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         # Resistance level (early highs)
-        resistance = recent_data['High'].iloc[:10].max()
+        resistance = features.high_max(40, 0, 10)
         breakout = current_price > resistance * 0.98  # Near resistance
         
         # Volume should increase on the right side of the pattern
-        left_volume = recent_data['Volume'].iloc[:len(recent_data)//2].mean()
-        right_volume = recent_data['Volume'].iloc[len(recent_data)//2:].mean()
+        left_volume = features.volume_mean(40, 0, half)
+        right_volume = features.volume_mean(40, half)
         volume_increase = right_volume > left_volume * 1.1
         
         if not (centered_bottom and smooth_pattern and breakout and volume_increase):
@@ -2255,32 +3427,33 @@ class ProfessionalPCSScanner:
             return False, 0
         
         # This is a counter-trend pattern - rounding top that breaks upward instead of downward
-        recent_data = data.tail(35)
+        features = self.get_bar_features(data)
+        recent_close = features.close[-35:]
         
         # Find the peak of the rounding pattern
-        peak_idx = recent_data['High'].idxmax()
-        peak_price = recent_data['High'].max()
+        peak_position = np.nanargmax(features.high[-35:])
+        peak_price = features.high_max(35)
         
         # Check pattern before and after peak
-        pre_peak = recent_data.iloc[:list(recent_data.index).index(peak_idx)]
-        post_peak = recent_data.iloc[list(recent_data.index).index(peak_idx):]
+        pre_peak = recent_close[:peak_position]
+        post_peak = recent_close[peak_position:]
         
         if len(pre_peak) < 10 or len(post_peak) < 10:
             return False, 0
         
         # Check for rounding formation
-        pre_peak_rise = (pre_peak['Close'].iloc[-1] - pre_peak['Close'].iloc[0]) > 0
-        post_peak_decline = (post_peak['Close'].iloc[-5] - post_peak['Close'].iloc[0]) < 0
+        pre_peak_rise = (pre_peak[-1] - pre_peak[0]) > 0
+        post_peak_decline = (post_peak[-5] - post_peak[0]) < 0
         
         # But CURRENT DAY should break upward (bullish)
-        current_price = data['Close'].iloc[-1]
-        current_volume = data['Volume'].iloc[-1]
+        current_price = features.last_close
+        current_volume = features.last_volume
         
         # Breakout above the rounding top peak
         upside_breakout = current_price > peak_price * 1.005  # 0.5% above peak
         
         # Volume confirmation
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        avg_volume = features.avg_volume[20]
         volume_breakout = current_volume > avg_volume * 1.4
         
         # This is a rare but powerful pattern
@@ -2301,36 +3474,33 @@ class ProfessionalPCSScanner:
         if len(data) < 25:
             return False, 0
         
-        # Scallop pattern: gradual decline followed by sharp recovery
-        recent_data = data.tail(25)
-        
-        # Divide into decline and recovery phases
-        decline_phase = recent_data.iloc[:15]
-        recovery_phase = recent_data.iloc[15:]
+        # Scallop pattern over the last 25 days: gradual decline (first 15) followed by sharp recovery
+        features = self.get_bar_features(data)
+        recent_close = features.close[-25:]
         
         # Pattern characteristics
-        decline_start = decline_phase['Close'].iloc[0]
-        decline_end = decline_phase['Close'].iloc[-1]
+        decline_start = recent_close[0]
+        decline_end = recent_close[14]
         decline_pct = ((decline_end - decline_start) / decline_start) * 100
         
         # Look for gradual decline (scallop shape)
         gradual_decline = -15 <= decline_pct <= -3  # 3-15% decline
         
         # Volume should be lower during decline
-        decline_volume = decline_phase['Volume'].mean()
-        recent_volume = data['Volume'].tail(5).mean()
+        decline_volume = features.volume_mean(25, 0, 15)
+        recent_volume = features.volume_mean(5)
         volume_pickup = recent_volume > decline_volume * 1.3
         
         # CURRENT DAY recovery
-        current_price = data['Close'].iloc[-1]
-        recovery_start = recovery_phase['Close'].iloc[0]
+        current_price = features.last_close
+        recovery_start = recent_close[15]
         recovery_pct = ((current_price - recovery_start) / recovery_start) * 100
         
         sharp_recovery = recovery_pct >= 2  # At least 2% recovery
         
         # Current day should be near highs
-        current_volume = data['Volume'].iloc[-1]
-        avg_volume = data['Volume'].tail(21).iloc[:-1].mean()
+        current_volume = features.last_volume
+        avg_volume = features.avg_volume[20]
         volume_confirmation = current_volume > avg_volume * 1.2
         
         if not (gradual_decline and volume_pickup and sharp_recovery and volume_confirmation):
@@ -2376,25 +3546,10 @@ class ProfessionalPCSScanner:
         if weekly_data is None or len(weekly_data) < 15:
             return patterns
         
-        # Get current weekly metrics
-        current_weekly_close = weekly_data['Close'].iloc[-1]
-        current_weekly_rsi = weekly_data['RSI'].iloc[-1] if not weekly_data['RSI'].isna().iloc[-1] else 50
-        current_weekly_adx = weekly_data['ADX'].iloc[-1] if not weekly_data['ADX'].isna().iloc[-1] else 20
-        weekly_sma_10 = weekly_data['SMA_10'].iloc[-1] if not weekly_data['SMA_10'].isna().iloc[-1] else current_weekly_close
-        weekly_sma_20 = weekly_data['SMA_20'].iloc[-1] if not weekly_data['SMA_20'].isna().iloc[-1] else current_weekly_close
-        
         # Apply filters based on WEEKLY data
-        if not (filters['rsi_min'] <= current_weekly_rsi <= filters['rsi_max']):
-            return patterns
-        
-        if current_weekly_adx < filters['adx_min']:
+        if not weekly_filter_passes(weekly_screen_values(weekly_data), filters):
             return patterns
         
-        # Weekly MA support check
-        if filters['ma_support']:
-            if current_weekly_close < weekly_sma_10 * (1 - filters['ma_tolerance']/100):
-                return patterns
-        
         # Get pattern filters
         pattern_filters = filters.get('pattern_filters', {})
         pattern_priority = filters.get('pattern_priority', 'All Patterns (Comprehensive)')
@@ -2406,6 +3561,7 @@ class ProfessionalPCSScanner:
             weekly_breakout_detected, weekly_breakout_strength = self.detect_weekly_breakout(weekly_data)
             if weekly_breakout_detected and weekly_breakout_strength >= filters['pattern_strength_min']:
                 pattern_data = {
+                    'key': 'current_day_breakout',
                     'type': 'Weekly Breakout',
                     'strength': weekly_breakout_strength,
                     'success_rate': 88,
@@ -2423,6 +3579,7 @@ class ProfessionalPCSScanner:
             weekly_cup_detected, weekly_cup_strength = self.detect_weekly_cup_and_handle(weekly_data)
             if weekly_cup_detected and weekly_cup_strength >= filters['pattern_strength_min']:
                 pattern_data = {
+                    'key': 'cup_and_handle',
                     'type': 'Weekly Cup and Handle',
                     'strength': weekly_cup_strength,
                     'success_rate': 82,
@@ -2439,6 +3596,7 @@ class ProfessionalPCSScanner:
             weekly_db_detected, weekly_db_strength = self.detect_weekly_double_bottom(weekly_data)
             if weekly_db_detected and weekly_db_strength >= filters['pattern_strength_min']:
                 pattern_data = {
+                    'key': 'double_bottom',
                     'type': 'Weekly Double Bottom',
                     'strength': weekly_db_strength,
                     'success_rate': 78,
@@ -2455,6 +3613,7 @@ class ProfessionalPCSScanner:
             weekly_support_detected, weekly_support_strength = self.detect_weekly_support_test(weekly_data)
             if weekly_support_detected and weekly_support_strength >= filters['pattern_strength_min']:
                 pattern_data = {
+                    'key': 'rectangle_bottom',
                     'type': 'Weekly Support Test',
                     'strength': weekly_support_strength,
                     'success_rate': 75,
@@ -2665,6 +3824,22 @@ class ProfessionalPCSScanner:
             row=1, col=1
         )
         
+        # Volume profile: value area band and point of control
+        profile = self.get_volume_profile(data)
+        if profile is not None:
+            fig.add_hrect(
+                y0=profile['value_area_low'], y1=profile['value_area_high'],
+                fillcolor="#3182CE", opacity=0.08, line_width=0,
+                row=1, col=1
+            )
+            fig.add_hline(
+                y=profile['poc'],
+                line_dash="dot",
+                line_color="#805AD5",
+                row=1, col=1,
+                annotation_text=f"POC: ₹{profile['poc']:.2f}"
+            )
+        
         # Highlight current day breakout if present
         if pattern_info and pattern_info.get('special') == 'CURRENT_DAY_BREAKOUT':
             details = pattern_info.get('details', {})
@@ -2780,10 +3955,57 @@ class ProfessionalPCSScanner:
         
         return fig
 
+    # =================== SHARED FRAME FEATURES ===================
+    
+    def _frame_features(self, data):
+        """Feature memo for one frame object; dropped when the frame is garbage collected"""
+        key = id(data)
+        with self._frame_feature_lock:
+            entry = self._frame_feature_store.get(key)
+            if entry is None or entry[0]() is not data:
+                entry = (weakref.ref(data), {})
+                self._frame_feature_store[key] = entry
+                weakref.finalize(data, self._frame_feature_store.pop, key, None)
+            return entry[1]
+    
+    def get_bar_features(self, data):
+        """Shared detector inputs for a daily frame, computed once per frame"""
+        features = self._frame_features(data)
+        if 'bar_features' not in features:
+            features['bar_features'] = BarFeatures(data)
+        return features['bar_features']
+    
+    def get_swing_points(self, data, kind='high', left=2, right=2):
+        """Swing highs/lows of the whole frame as (indices, prices), computed once per frame"""
+        features = self._frame_features(data)
+        key = ('swing_points', kind, left, right)
+        if key not in features:
+            column = 'High' if kind == 'high' else 'Low'
+            features[key] = find_swing_points(data[column].to_numpy(dtype=float), left, right, kind)
+        return features[key]
+    
+    def get_volume_profile(self, data, window=VOLUME_PROFILE_LOOKBACK):
+        """Volume-at-price profile of the last `window` bars, computed once per frame"""
+        features = self._frame_features(data)
+        key = ('volume_profile', window)
+        if key not in features:
+            recent_data = data.tail(window)
+            features[key] = compute_volume_profile(recent_data['High'], recent_data['Low'], recent_data['Volume'])
+        return features[key]
+    
+    def _swing_points_in_window(self, data, window, kind='high', left=2, right=2):
+        """Swing points a scan of data.tail(window) would find: the shared pivots that have `left` bars inside the window"""
+        indices, prices = self.get_swing_points(data, kind, left, right)
+        in_window = indices >= len(data) - min(window, len(data)) + left
+        return indices[in_window], prices[in_window]
+    
     # =================== ENHANCEMENT 1: DELIVERY VOLUME ANALYSIS ===================
     
-    def analyze_delivery_volume_percentage(self, symbol):
-        """Enhanced delivery volume percentage analysis with professional insights"""
+    def analyze_delivery_volume_percentage(self, symbol, data=None):
+        """
+        Enhanced delivery volume percentage analysis with professional insights.
+        Pass the scan's indicator frame as `data`; otherwise it is taken from the price/indicator caches.
+        """
         try:
             import requests
             import re
@@ -2791,14 +4013,23 @@ class ProfessionalPCSScanner:
             import numpy as np
             from datetime import datetime, timedelta
             
+            if data is None:
+                data = self.get_stock_data(symbol, period=SCAN_DATA_PERIOD)
+            
+            # Reported delivery for the frame's latest session, when its bhavcopy has been ingested
+            session = data.index[-1] if data is not None and len(data) else None
+            delivery_record = self.delivery_store.lookup(symbol.replace('.NS', ''), session) if session is not None else None
+            if delivery_record is not None:
+                return self._analyze_reported_delivery(delivery_record)
+            
             # Try to get delivery data from NSE (fallback method)
-            delivery_info = self._get_delivery_data_fallback(symbol)
+            delivery_info = self._get_delivery_data_fallback(data)
             
             if delivery_info:
                 return delivery_info
             else:
                 # Fallback: Estimate delivery volume from price action and volume patterns
-                return self._estimate_delivery_volume(symbol)
+                return self._estimate_delivery_volume(data)
                 
         except Exception as e:
             return {
@@ -2808,11 +4039,52 @@ class ProfessionalPCSScanner:
                 'confidence': 'Low'
             }
     
-    def _get_delivery_data_fallback(self, symbol):
-        """Fallback method to estimate delivery volume using technical analysis"""
+    def _analyze_reported_delivery(self, record):
+        """Delivery analysis from a bhavcopy record: actual delivery %, quantity and their rolling averages"""
+        delivery_pct = record['delivery_pct']
+        avg_5 = record['delivery_pct_avg_5']
+        avg_20 = record['delivery_pct_avg_20']
+        qty_ratio = record['delivery_qty'] / record['delivery_qty_avg_20'] if record['delivery_qty_avg_20'] > 0 else 1
+        signals = []
+        
+        if delivery_pct >= 60:
+            signals.append(f"High delivery ({delivery_pct:.1f}% of traded quantity)")
+        elif delivery_pct >= 40:
+            signals.append(f"Healthy delivery ({delivery_pct:.1f}% of traded quantity)")
+        
+        if avg_20 > 0 and delivery_pct >= avg_20 * 1.25:
+            signals.append(f"Delivery above its 20-day average ({delivery_pct:.1f}% vs {avg_20:.1f}%)")
+        if avg_20 > 0 and avg_5 >= avg_20 * 1.1:
+            signals.append(f"Rising 5-day delivery trend ({avg_5:.1f}% vs {avg_20:.1f}% over 20 days)")
+        if qty_ratio >= 1.5:
+            signals.append(f"Delivered quantity {qty_ratio:.1f}x its 20-day average")
+        
+        if delivery_pct >= 60:
+            analysis = "Strong delivery - institutional accumulation likely"
+            confidence = 'High'
+        elif delivery_pct >= 40:
+            analysis = "Moderate delivery - some institutional interest"
+            confidence = 'Medium'
+        else:
+            analysis = "Low delivery - mostly intraday/speculative trading"
+            confidence = 'Low'
+        
+        return {
+            'delivery_percentage': delivery_pct,
+            'delivery_analysis': analysis,
+            'delivery_signals': signals,
+            'confidence': confidence,
+            'source': 'NSE bhavcopy',
+            'session': record['date'].strftime('%Y-%m-%d'),
+            'delivery_quantity': None if np.isnan(record['delivery_qty']) else int(record['delivery_qty']),
+            'traded_quantity': None if np.isnan(record['traded_qty']) else int(record['traded_qty']),
+            'avg_delivery_5d': avg_5,
+            'avg_delivery_20d': avg_20
+        }
+    
+    def _get_delivery_data_fallback(self, data):
+        """Fallback method to estimate delivery volume using technical analysis (last 10 sessions of `data`)"""
         try:
-            # Get stock data
-            data = self.get_stock_data(symbol, period="1mo")
             if data is None or len(data) < 10:
                 return None
             
@@ -2901,10 +4173,9 @@ class ProfessionalPCSScanner:
         except Exception as e:
             return None
     
-    def _estimate_delivery_volume(self, symbol):
-        """Estimate delivery volume using advanced technical analysis"""
+    def _estimate_delivery_volume(self, data):
+        """Estimate delivery volume using advanced technical analysis (last 20 sessions of `data`)"""
         try:
-            data = self.get_stock_data(symbol, period="2mo")
             if data is None or len(data) < 20:
                 return None
             
@@ -3076,14 +4347,9 @@ class ProfessionalPCSScanner:
             recent_data = data.tail(lookback_days * 2)  # Look back further for resistance
             current_price = data['Close'].iloc[-1]
             
-            # Find peaks (resistance levels)
-            highs = recent_data['High']
-            peaks = []
-            
-            for i in range(2, len(highs) - 2):
-                if (highs.iloc[i] > highs.iloc[i-1] and highs.iloc[i] > highs.iloc[i-2] and 
-                    highs.iloc[i] > highs.iloc[i+1] and highs.iloc[i] > highs.iloc[i+2]):
-                    peaks.append(highs.iloc[i])
+            # Find peaks (resistance levels) from the shared pivot engine
+            _, peaks = self._swing_points_in_window(data, lookback_days * 2, 'high')
+            peaks = peaks.tolist()
             
             if not peaks:
                 return {'strong_resistance': False, 'signals': [], 'strength': 0}
@@ -3641,6 +4907,7 @@ class ProfessionalPCSScanner:
                 'position_analysis': position_analysis,
                 'breakout_analysis': breakout_analysis,
                 'volume_analysis': volume_analysis,
+                'volume_profile': self._summarize_volume_profile(self.get_volume_profile(data, lookback_days)),
                 'analysis_summary': analysis_summary,
                 'key_levels': {
                     'immediate_support': support_levels[0] if support_levels else None,
@@ -3658,6 +4925,18 @@ class ProfessionalPCSScanner:
                 'resistance_levels': []
             }
     
+    def _summarize_volume_profile(self, profile):
+        """Plain-float summary of a volume profile for results and display"""
+        if profile is None:
+            return None
+        return {
+            'poc': float(profile['poc']),
+            'value_area_low': float(profile['value_area_low']),
+            'value_area_high': float(profile['value_area_high']),
+            'hvn': [float(node) for node in profile['hvn']],
+            'lvn': [float(node) for node in profile['lvn']]
+        }
+    
     def _identify_multiple_sr_levels(self, data, lookback_days):
         """Identify multiple support and resistance levels using various methods"""
         try:
@@ -3692,39 +4971,26 @@ class ProfessionalPCSScanner:
         """Find pivot highs and lows as S&R levels"""
         try:
             levels = []
-            recent_data = data.tail(lookback_days)
             
             # Find pivot highs (resistance)
-            for i in range(2, len(recent_data) - 2):
-                current_high = recent_data['High'].iloc[i]
-                if (current_high > recent_data['High'].iloc[i-1] and 
-                    current_high > recent_data['High'].iloc[i-2] and
-                    current_high > recent_data['High'].iloc[i+1] and 
-                    current_high > recent_data['High'].iloc[i+2]):
-                    
-                    levels.append({
-                        'level': current_high,
-                        'type': 'resistance',
-                        'method': 'pivot_high',
-                        'date': recent_data.index[i],
-                        'base_strength': 30
-                    })
+            for index, price in zip(*self._swing_points_in_window(data, lookback_days, 'high')):
+                levels.append({
+                    'level': price,
+                    'type': 'resistance',
+                    'method': 'pivot_high',
+                    'date': data.index[index],
+                    'base_strength': 30
+                })
             
             # Find pivot lows (support)
-            for i in range(2, len(recent_data) - 2):
-                current_low = recent_data['Low'].iloc[i]
-                if (current_low < recent_data['Low'].iloc[i-1] and 
-                    current_low < recent_data['Low'].iloc[i-2] and
-                    current_low < recent_data['Low'].iloc[i+1] and 
-                    current_low < recent_data['Low'].iloc[i+2]):
-                    
-                    levels.append({
-                        'level': current_low,
-                        'type': 'support',
-                        'method': 'pivot_low',
-                        'date': recent_data.index[i],
-                        'base_strength': 30
-                    })
+            for index, price in zip(*self._swing_points_in_window(data, lookback_days, 'low')):
+                levels.append({
+                    'level': price,
+                    'type': 'support',
+                    'method': 'pivot_low',
+                    'date': data.index[index],
+                    'base_strength': 30
+                })
             
             return levels
             
@@ -3767,63 +5033,33 @@ class ProfessionalPCSScanner:
             return []
     
     def _find_volume_based_levels(self, data, lookback_days):
-        """Find support/resistance based on high volume zones"""
+        """Find support/resistance from the volume profile: point of control, value area edges and high volume nodes"""
         try:
             levels = []
-            recent_data = data.tail(lookback_days)
+            profile = self.get_volume_profile(data, lookback_days)
             
-            # Find high volume days
-            volume_threshold = recent_data['Volume'].quantile(0.8)  # Top 20% volume days
-            high_volume_data = recent_data[recent_data['Volume'] >= volume_threshold]
-            
-            if len(high_volume_data) == 0:
+            if profile is None:
                 return levels
             
-            # Create price zones from high volume days
-            price_zones = []
-            for _, row in high_volume_data.iterrows():
-                zone_center = (row['High'] + row['Low']) / 2
-                price_zones.append(zone_center)
-            
-            # Cluster similar price zones
-            price_zones.sort()
-            clustered_zones = []
-            
-            if price_zones:
-                current_cluster = [price_zones[0]]
-                for price in price_zones[1:]:
-                    if abs(price - current_cluster[-1]) / current_cluster[-1] < 0.02:  # Within 2%
-                        current_cluster.append(price)
-                    else:
-                        if len(current_cluster) >= 2:  # At least 2 occurrences
-                            zone_avg = sum(current_cluster) / len(current_cluster)
-                            clustered_zones.append({
-                                'level': zone_avg,
-                                'occurrences': len(current_cluster)
-                            })
-                        current_cluster = [price]
-                
-                # Add last cluster
-                if len(current_cluster) >= 2:
-                    zone_avg = sum(current_cluster) / len(current_cluster)
-                    clustered_zones.append({
-                        'level': zone_avg,
-                        'occurrences': len(current_cluster)
-                    })
+            candidates = [
+                (profile['poc'], 'volume_poc', 45),
+                (profile['value_area_high'], 'value_area_high', 35),
+                (profile['value_area_low'], 'value_area_low', 35),
+            ]
+            candidates.extend((node, 'volume_hvn', 30) for node in profile['hvn'] if node != profile['poc'])
             
             # Convert to S&R levels
             current_price = data['Close'].iloc[-1]
-            for zone in clustered_zones:
-                sr_type = 'support' if zone['level'] < current_price else 'resistance'
-                strength = min(25 + (zone['occurrences'] * 5), 45)
-                
+            total_volume = profile['volume'].sum()
+            for price, method, strength in candidates:
+                bucket = min(np.searchsorted(profile['bin_edges'], price, side='right') - 1, len(profile['volume']) - 1)
                 levels.append({
-                    'level': zone['level'],
-                    'type': sr_type,
-                    'method': 'volume_zone',
+                    'level': float(price),
+                    'type': 'support' if price < current_price else 'resistance',
+                    'method': method,
                     'date': data.index[-1],
                     'base_strength': strength,
-                    'occurrences': zone['occurrences']
+                    'volume_share': float(profile['volume'][bucket] / total_volume)
                 })
             
             return levels
@@ -3912,23 +5148,15 @@ class ProfessionalPCSScanner:
         """Analyze the strength of each support/resistance level"""
         try:
             analyzed_levels = []
+            current_close = data['Close'].iloc[-1]
             
-            for level_info in sr_levels:
+            # Test count, recency, volume and reaction bonuses for all levels at once
+            scores = self._score_level_tests(data, [level_info['level'] for level_info in sr_levels])
+            
+            for level_info, (test_count, recency_bonus, volume_bonus, reaction_bonus) in zip(sr_levels, scores):
                 level = level_info['level']
                 base_strength = level_info.get('base_strength', 20)
                 
-                # Test count - how many times price tested this level
-                test_count = self._count_level_tests(data, level)
-                
-                # Recency - how recent was the last test
-                recency_bonus = self._calculate_recency_bonus(data, level)
-                
-                # Volume at level - higher volume = stronger level
-                volume_bonus = self._calculate_volume_bonus(data, level)
-                
-                # Price reaction strength
-                reaction_bonus = self._calculate_reaction_bonus(data, level)
-                
                 # Calculate total strength
                 total_strength = min(base_strength + test_count * 15 + recency_bonus + volume_bonus + reaction_bonus, 100)
                 
@@ -3939,8 +5167,8 @@ class ProfessionalPCSScanner:
                     'recency_bonus': recency_bonus,
                     'volume_bonus': volume_bonus,
                     'reaction_bonus': reaction_bonus,
-                    'distance_from_current': abs(level - data['Close'].iloc[-1]),
-                    'distance_percentage': (abs(level - data['Close'].iloc[-1]) / data['Close'].iloc[-1]) * 100
+                    'distance_from_current': abs(level - current_close),
+                    'distance_percentage': (abs(level - current_close) / current_close) * 100
                 }
                 
                 analyzed_levels.append(analyzed_level)
@@ -3950,113 +5178,64 @@ class ProfessionalPCSScanner:
         except Exception as e:
             return sr_levels
     
-    def _count_level_tests(self, data, level, tolerance=0.02):
-        """Count how many times price tested a level"""
-        try:
-            test_count = 0
-            
-            for _, row in data.iterrows():
-                # Check if high or low tested the level
-                high_test = abs(row['High'] - level) / level <= tolerance
-                low_test = abs(row['Low'] - level) / level <= tolerance
-                
-                if high_test or low_test:
-                    test_count += 1
-            
-            return min(test_count, 10)  # Cap at 10
-            
-        except Exception as e:
-            return 0
-    
-    def _calculate_recency_bonus(self, data, level, tolerance=0.02):
-        """Calculate bonus for recent level tests"""
-        try:
-            recent_data = data.tail(10)  # Last 10 days
-            
-            for i, (_, row) in enumerate(recent_data.iterrows()):
-                high_test = abs(row['High'] - level) / level <= tolerance
-                low_test = abs(row['Low'] - level) / level <= tolerance
-                
-                if high_test or low_test:
-                    # More recent = higher bonus
-                    return 15 - i  # 15 for today, 14 for yesterday, etc.
-            
-            return 0
-            
-        except Exception as e:
-            return 0
-    
-    def _calculate_volume_bonus(self, data, level, tolerance=0.02):
-        """Calculate bonus for high volume at level"""
-        try:
-            volume_at_level = []
-            avg_volume = data['Volume'].mean()
-            
-            for _, row in data.iterrows():
-                high_test = abs(row['High'] - level) / level <= tolerance
-                low_test = abs(row['Low'] - level) / level <= tolerance
-                
-                if high_test or low_test:
-                    volume_at_level.append(row['Volume'])
-            
-            if not volume_at_level:
-                return 0
-            
-            max_volume = max(volume_at_level)
-            volume_ratio = max_volume / avg_volume
-            
-            if volume_ratio >= 2:
-                return 15
-            elif volume_ratio >= 1.5:
-                return 10
-            elif volume_ratio >= 1.2:
-                return 5
-            else:
-                return 0
-                
-        except Exception as e:
-            return 0
+    def _level_test_mask(self, data, levels, tolerance=0.02):
+        """levels x bars mask: True where the bar's High or Low came within `tolerance` of the level"""
+        levels = np.asarray(levels, dtype=float)[:, None]
+        high = data['High'].to_numpy(dtype=float)[None, :]
+        low = data['Low'].to_numpy(dtype=float)[None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (np.abs(high - levels) / levels <= tolerance) | (np.abs(low - levels) / levels <= tolerance)
     
-    def _calculate_reaction_bonus(self, data, level, tolerance=0.02):
-        """Calculate bonus for strong price reactions at level"""
-        try:
-            reactions = []
-            
-            for i in range(1, len(data)):
-                current_row = data.iloc[i]
-                prev_row = data.iloc[i-1]
-                
-                # Check if price tested level and reacted
-                level_tested = (abs(current_row['Low'] - level) / level <= tolerance or 
-                              abs(current_row['High'] - level) / level <= tolerance)
-                
-                if level_tested and i < len(data) - 1:
-                    next_row = data.iloc[i+1]
-                    
-                    # Calculate reaction strength
-                    if level < current_row['Close']:  # Support level
-                        reaction = (next_row['Close'] - current_row['Low']) / current_row['Low'] * 100
-                    else:  # Resistance level
-                        reaction = (current_row['High'] - next_row['Close']) / next_row['Close'] * 100
-                    
-                    reactions.append(max(reaction, 0))
-            
-            if not reactions:
-                return 0
-            
-            max_reaction = max(reactions)
-            
-            if max_reaction >= 5:
-                return 15
-            elif max_reaction >= 3:
-                return 10
-            elif max_reaction >= 1:
-                return 5
-            else:
-                return 0
-                
-        except Exception as e:
-            return 0
+    def _score_level_tests(self, data, levels, tolerance=0.02):
+        """
+        (test_count, recency_bonus, volume_bonus, reaction_bonus) per level, all derived from
+        one levels x bars tolerance mask:
+        - test count: bars touching the level, capped at 10
+        - recency: 15 - position of the first touch within the last 10 bars
+        - volume: max volume on a touch bar relative to the average volume
+        - reaction: best next-bar move away from the level after a touch
+        """
+        if len(levels) == 0:
+            return []
+        
+        level_values = np.asarray(levels, dtype=float)
+        tested = self._level_test_mask(data, level_values, tolerance)
+        high = data['High'].to_numpy(dtype=float)
+        low = data['Low'].to_numpy(dtype=float)
+        close = data['Close'].to_numpy(dtype=float)
+        volume = data['Volume'].to_numpy(dtype=float)
+        
+        test_counts = np.minimum(tested.sum(axis=1), 10)
+        
+        recent = tested[:, -10:]
+        recency_bonus = np.where(recent.any(axis=1), 15 - recent.argmax(axis=1), 0)
+        
+        touched = tested.any(axis=1)
+        max_volume_at_level = np.where(tested, volume, -np.inf).max(axis=1)
+        volume_ratio = max_volume_at_level / data['Volume'].mean()
+        volume_bonus = np.select([volume_ratio >= 2, volume_ratio >= 1.5, volume_ratio >= 1.2], [15, 10, 5], 0)
+        volume_bonus = np.where(touched, volume_bonus, 0)
+        
+        # Reactions are measured on the bar after a touch, for bars 1..n-2
+        if len(close) >= 3:
+            bars = slice(1, len(close) - 1)
+            next_close = close[2:]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                bounce = (next_close - low[bars]) / low[bars] * 100
+                rejection = (high[bars] - next_close) / next_close * 100
+            is_support = level_values[:, None] < close[None, bars]
+            reaction = np.maximum(np.where(is_support, bounce[None, :], rejection[None, :]), 0)
+            reaction_tested = tested[:, bars]
+            max_reaction = np.where(reaction_tested, reaction, -np.inf).max(axis=1)
+            reaction_bonus = np.select([max_reaction >= 5, max_reaction >= 3, max_reaction >= 1], [15, 10, 5], 0)
+            reaction_bonus = np.where(reaction_tested.any(axis=1), reaction_bonus, 0)
+        else:
+            reaction_bonus = np.zeros(len(level_values), dtype=int)
+        
+        return [
+            (int(count), int(recency), int(vol_bonus), int(react_bonus))
+            for count, recency, vol_bonus, react_bonus in zip(test_counts, recency_bonus, volume_bonus, reaction_bonus)
+        ]
     
     def _analyze_current_price_position(self, current_price, analyzed_levels):
         """Analyze current price position relative to S&R levels"""
@@ -4161,32 +5340,28 @@ class ProfessionalPCSScanner:
         try:
             volume_insights = []
             
-            for level in analyzed_levels[:10]:  # Top 10 levels
-                level_price = level['level']
-                
-                # Find days when price was near this level
-                tolerance = 0.02
-                level_days = []
+            top_levels = analyzed_levels[:10]  # Top 10 levels
+            if top_levels:
+                # Days when price was near each level, from one levels x bars mask
+                near_level = self._level_test_mask(data, [level['level'] for level in top_levels])
+                volume = data['Volume'].to_numpy(dtype=float)
+                overall_avg_volume = data['Volume'].mean()
                 
-                for _, row in data.iterrows():
-                    near_level = (abs(row['High'] - level_price) / level_price <= tolerance or 
-                                abs(row['Low'] - level_price) / level_price <= tolerance)
+                for level, level_mask in zip(top_levels, near_level):
+                    test_days = int(level_mask.sum())
+                    if test_days == 0:
+                        continue
                     
-                    if near_level:
-                        level_days.append(row['Volume'])
-                
-                if level_days:
-                    avg_volume_at_level = sum(level_days) / len(level_days)
-                    overall_avg_volume = data['Volume'].mean()
+                    avg_volume_at_level = volume[level_mask].sum() / test_days
                     volume_ratio = avg_volume_at_level / overall_avg_volume
                     
                     volume_insights.append({
-                        'level': level_price,
+                        'level': level['level'],
                         'type': level['type'],
                         'method': level['method'],
                         'avg_volume_at_level': avg_volume_at_level,
                         'volume_ratio': volume_ratio,
-                        'test_days': len(level_days)
+                        'test_days': test_days
                     })
             
             # Sort by volume ratio
@@ -4270,6 +5445,893 @@ class ProfessionalPCSScanner:
                 'risk_assessment': 'Unknown',
                 'confidence_level': 'Low'
             }
+
+    # =================== PER-SYMBOL SCAN PIPELINE ===================
+    
+    def detect_symbol(self, symbol, config):
+        """Stage 2: the symbol's unfiltered detection narrowed by the config's thresholds; returns a ScanResult without enhancements, or None"""
+        try:
+            record = self.detect_symbol_raw(symbol, config)
+            if record is None:
+                return None
+            return self.filter_detection(record, config)
+        except Exception as e:
+            return None
+    
+    def detect_symbol_raw(self, symbol, config):
+        """
+        Unfiltered detection: latest-bar features, the volume ratio and every pattern the detectors
+        find under the config's detection settings (lookback, breakout volume, analysis mode).
+        Returns a ScanResult, possibly without patterns, for filter_detection to narrow down; None without data.
+        Results are memoized per symbol, latest bar and detection fingerprint.
+        """
+        try:
+            data = self.get_stock_data(symbol, period=SCAN_DATA_PERIOD)
+            if data is None:
+                return None
+            
+            cache_key = (symbol, data.index[-1], data['Close'].iloc[-1], len(data), detection_fingerprint(config))
+            cached = self._detection_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            _, volume_ratio, volume_details = self.check_volume_criteria(data)
+            patterns = self.detect_patterns(data, symbol, {**config, **UNFILTERED_DETECTION_SETTINGS})
+            
+            # Weekly-only scans also screen on the latest weekly bar
+            weekly_screen = None
+            if config.get('analysis_mode') == ANALYSIS_MODES['weekly']:
+                weekly_data = self.get_weekly_stock_data(symbol)
+                if weekly_data is not None and len(weekly_data) >= 15:
+                    weekly_screen = weekly_screen_values(weekly_data)
+            
+            record = ScanResult.from_frame(symbol, data, volume_ratio, volume_details, patterns, weekly_screen)
+            self._detection_cache.set(cache_key, record)
+            return record
+            
+        except Exception as e:
+            return None
+    
+    def filter_detection(self, result, config):
+        """
+        Apply the config's volume, RSI/ADX/MA-support, strength, pattern-selection and priority
+        settings to a detect_symbol_raw result. Returns what detect_symbol would have returned
+        for `config` (with only the enabled enhancements), or None.
+        """
+        if not result.volume_ratio >= config['min_volume_ratio']:
+            return None
+        if not current_day_filter_mask(result.current_price, result.rsi, result.adx, result.sma_20, result.ema_20, config):
+            return None
+        
+        weekly_only = config.get('analysis_mode') == ANALYSIS_MODES['weekly']
+        if weekly_only and (result.weekly_screen is None or not weekly_filter_passes(result.weekly_screen, config)):
+            return None
+        
+        pattern_filters = config.get('pattern_filters', {})
+        pattern_priority = config.get('pattern_priority', 'All Patterns (Comprehensive)')
+        
+        # As in detect_patterns, a detected current-day breakout is reported alone unless other patterns are enabled
+        breakout_key = CURRENT_DAY_BREAKOUT_PATTERN['key']
+        breakout_only = (
+            not weekly_only
+            and pattern_filters.get(breakout_key, True)
+            and any(pattern['key'] == breakout_key for pattern in result.patterns)
+            and len([k for k, v in pattern_filters.items() if v]) <= 1
+        )
+        
+        patterns = [
+            pattern for pattern in result.patterns
+            if pattern_filters.get(pattern['key'], PATTERN_FILTER_DEFAULTS[pattern['key']])
+            and pattern.get('daily_strength', pattern['strength']) >= config['pattern_strength_min']
+            and self._meets_priority_criteria(pattern, pattern_priority)
+            and not (breakout_only and pattern['key'] != breakout_key)
+        ]
+        if not patterns:
+            return None
+        
+        enabled = config.get('enhancements', {})
+        fields = result.to_dict()
+        fields['patterns'] = patterns
+        fields['enhancements'] = {name: value for name, value in result.enhancements.items() if enabled.get(name, False)}
+        return ScanResult(**fields)
+    
+    def needs_enrichment(self, config):
+        """True when stage 3 has any work to do"""
+        return any(config.get('enhancements', {}).values())
+    
+    def enrich_result(self, result, config):
+        """Stage 3: the enabled enhancements for a shortlisted result; returns a new ScanResult (news comes from NewsFeed)"""
+        symbol = result.symbol
+        data = self.get_stock_data(symbol, period=result.data_period)
+        if data is None:
+            return result
+        
+        # Enhancement outputs depend only on the bars, so each is computed once per symbol and latest bar
+        cache_key = (symbol, data.index[-1], data['Close'].iloc[-1], len(data))
+        computed = self._enhancement_cache.get(cache_key) or {}
+        enabled = config.get('enhancements', {})
+        missing = {name for name in ENHANCEMENT_KEYS if enabled.get(name, False) and name not in computed}
+        
+        # =================== PROCESS ENHANCEMENTS ===================
+        enhancement_results = {}
+        
+        if 'delivery_volume' in missing:
+            try:
+                delivery_analysis = self.analyze_delivery_volume_percentage(symbol, data)
+                enhancement_results['delivery_volume'] = delivery_analysis
+            except Exception as e:
+                enhancement_results['delivery_volume'] = {
+                    'delivery_percentage': None,
+                    'delivery_analysis': f'Error: {str(e)}',
+                    'delivery_signals': [],
+                    'confidence': 'Low'
+                }
+        
+        if 'fno_consolidation' in missing:
+            try:
+                consolidation_analysis = self.detect_fno_consolidation_near_resistance(
+                    data, symbol, lookback_days=20
+                )
+                enhancement_results['fno_consolidation'] = consolidation_analysis
+            except Exception as e:
+                enhancement_results['fno_consolidation'] = {
+                    'consolidation_detected': False,
+                    'analysis': f'Error: {str(e)}',
+                    'signals': []
+                }
+        
+        if 'breakout_pullback' in missing:
+            try:
+                breakout_pullback_analysis = self.detect_breakout_pullback_strong_green(
+                    data, lookback_days=30
+                )
+                enhancement_results['breakout_pullback'] = breakout_pullback_analysis
+            except Exception as e:
+                enhancement_results['breakout_pullback'] = {
+                    'pattern_detected': False,
+                    'analysis': f'Error: {str(e)}',
+                    'signals': []
+                }
+        
+        if 'enhanced_sr' in missing:
+            try:
+                sr_analysis = self.enhanced_support_resistance_analysis(
+                    data, lookback_days=50
+                )
+                enhancement_results['enhanced_sr'] = sr_analysis
+            except Exception as e:
+                enhancement_results['enhanced_sr'] = {
+                    'analysis_available': False,
+                    'message': f'Error: {str(e)}',
+                    'support_levels': [],
+                    'resistance_levels': []
+                }
+        
+        if missing:
+            computed = {**computed, **enhancement_results}
+            self._enhancement_cache.set(cache_key, computed)
+        
+        # Add the enabled enhancement results to a copy of the detection result
+        return result.with_enhancements({name: computed[name] for name in ENHANCEMENT_KEYS if enabled.get(name, False)})
+    
+    def analyze_symbol(self, symbol, config):
+        """Run the full current-day analysis for one symbol; returns a ScanResult or None"""
+        result = self.detect_symbol(symbol, config)
+        if result is None:
+            return None
+        try:
+            return self.enrich_result(result, config)
+        except Exception as e:
+            return None
+
+# =================== PARALLEL SCAN ENGINE ===================
+
+DEFAULT_SCAN_WORKERS = 8
+DEFAULT_SYMBOL_TIMEOUT = 30  # seconds a single symbol may spend in analysis
+
+class ParallelScanEngine:
+    """
+    Staged scan funnel over a bounded worker pool:
+      1. Screen   - volume ratio, RSI, ADX and MA support for the whole universe from panel features
+      2. Patterns - full indicator frame and pattern detectors for the stage-1 survivors; detections
+                    are memoized unfiltered, so threshold-only changes just re-filter them
+      3. Enrich   - the enabled enhancements for the shortlist only (news is fetched by NewsFeed)
+    Results are collected in universe order, symbols exceeding the per-symbol timeout
+    are abandoned, and progress is reported from the calling (Streamlit main) thread.
+    Per-stage counts and timings are kept in `stage_stats`, and the shared market sentiment
+    snapshot the scan ran under in `market_sentiment`.
+    """
+    
+    def __init__(self, scanner, max_workers=DEFAULT_SCAN_WORKERS, symbol_timeout=DEFAULT_SYMBOL_TIMEOUT, caches=None):
+        self.scanner = scanner
+        self.caches = caches
+        self.max_workers = max(1, int(max_workers))
+        self.symbol_timeout = symbol_timeout
+        self.timed_out = []
+        self.failed = []
+        self.prefiltered_out = 0
+        self.stage_stats = []
+        self.market_sentiment = None
+    
+    def _record_stage(self, stage, stocks_in, stocks_out, started):
+        self.stage_stats.append({
+            'stage': stage,
+            'stocks_in': stocks_in,
+            'stocks_out': stocks_out,
+            'seconds': round(time.monotonic() - started, 2)
+        })
+    
+    def _run_task(self, index, task, item, started_at):
+        started_at[index] = time.monotonic()
+        return task(item)
+    
+    def _run_stage(self, items, labels, task, progress_callback=None):
+        """Run task(item) for every item on the worker pool; returns per-item results, None where it failed or timed out"""
+        total = len(items)
+        slots = [None] * total
+        started_at = {}
+        if total == 0:
+            return slots
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, total))
+        try:
+            futures = {
+                executor.submit(self._run_task, i, task, item, started_at): i
+                for i, item in enumerate(items)
+            }
+            pending = set(futures)
+            completed = 0
+            
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    index = futures[future]
+                    try:
+                        slots[index] = future.result()
+                    except Exception:
+                        self.failed.append(labels[index])
+                    completed += 1
+                    if progress_callback:
+                        progress_callback(completed, total, labels[index])
+                
+                # Abandon items that have been running longer than the per-symbol timeout
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    start = started_at.get(index)
+                    if start is not None and now - start > self.symbol_timeout:
+                        pending.discard(future)
+                        future.cancel()
+                        self.timed_out.append(labels[index])
+                        completed += 1
+                        if progress_callback:
+                            progress_callback(completed, total, labels[index])
+        finally:
+            # Do not block on abandoned workers; queued work is cancelled
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return slots
+    
+    def _reset(self):
+        self.timed_out = []
+        self.failed = []
+        self.prefiltered_out = 0
+        self.stage_stats = []
+        self.market_sentiment = get_market_sentiment_snapshot(self.caches)
+    
+    def _prefetch(self, symbols, config, status_callback=None):
+        """Fetch the whole universe in a few batched requests before fanning out"""
+        def report_batch(batch_index, batch_count, batch):
+            if status_callback:
+                status_callback(f"📥 Downloading price data (batch {batch_index}/{batch_count}, {len(batch)} stocks)")
+        
+        started = time.monotonic()
+        self.scanner.prefetch_price_history(
+            symbols,
+            period=HISTORY_PERIOD,
+            batch_size=config.get('download_batch_size', DEFAULT_DOWNLOAD_BATCH_SIZE),
+            progress_callback=report_batch
+        )
+        self._record_stage('Download', len(symbols), len(self.scanner.loaded_symbols(symbols)), started)
+    
+    def run_unfiltered(self, symbols, config, progress_callback=None, status_callback=None):
+        """
+        Unfiltered detection and the enabled enhancements for every symbol with data, without
+        the screen stage; returns detect_symbol_raw records (with or without patterns) in the
+        order of `symbols`, for filter_detection to narrow down.
+        """
+        symbols = list(symbols)
+        self._reset()
+        if not symbols:
+            return []
+        
+        self._prefetch(symbols, config, status_callback)
+        
+        started = time.monotonic()
+        if status_callback:
+            status_callback(f"🔍 Detecting patterns in {len(symbols)} stocks")
+        detections = self._run_stage(
+            symbols, symbols,
+            lambda symbol: self.scanner.detect_symbol_raw(symbol, config),
+            progress_callback
+        )
+        records = [record for record in detections if record is not None]
+        self._record_stage('Detect', len(symbols), len(records), started)
+        
+        if records and self.scanner.needs_enrichment(config):
+            started = time.monotonic()
+            if status_callback:
+                status_callback(f"🚀 Enhancements for {len(records)} stocks")
+            enriched = self._run_stage(
+                records, [record.symbol for record in records],
+                lambda record: self.scanner.enrich_result(record, config),
+                progress_callback
+            )
+            records = [full if full is not None else record for full, record in zip(enriched, records)]
+            self._record_stage('Enrich', len(enriched), len(records), started)
+        
+        return records
+    
+    def run(self, symbols, config, progress_callback=None, status_callback=None):
+        """Run the funnel over all symbols and return the non-empty results in the order of `symbols`"""
+        symbols = list(symbols)
+        total = len(symbols)
+        self._reset()
+        
+        if total == 0:
+            return []
+        
+        self._prefetch(symbols, config, status_callback)
+        
+        # Stage 1: drop symbols failing the volume/RSI/ADX/MA-support checks before any per-symbol work
+        if config.get('panel_prefilter', False):
+            started = time.monotonic()
+            if status_callback:
+                status_callback(f"🧮 Stage 1: screening {total} stocks")
+            candidates = self.scanner.screen_symbols(symbols, config)
+            self.prefiltered_out = total - len(candidates)
+            self._record_stage('Screen', total, len(candidates), started)
+        else:
+            candidates = symbols
+        
+        # Stage 2: pattern detectors on the survivors
+        started = time.monotonic()
+        if status_callback:
+            status_callback(f"🔍 Stage 2: detecting patterns in {len(candidates)} stocks")
+        detections = self._run_stage(
+            candidates, candidates,
+            lambda symbol: self.scanner.detect_symbol(symbol, config),
+            progress_callback
+        )
+        shortlist = [result for result in detections if result is not None]
+        self._record_stage('Patterns', len(candidates), len(shortlist), started)
+        
+        # Stage 3: enhancements on the shortlist only
+        if shortlist and self.scanner.needs_enrichment(config):
+            started = time.monotonic()
+            if status_callback:
+                status_callback(f"🚀 Stage 3: enhancements for {len(shortlist)} stocks")
+            enriched = self._run_stage(
+                shortlist, [result.symbol for result in shortlist],
+                lambda result: self.scanner.enrich_result(result, config),
+                progress_callback
+            )
+            # A shortlisted stock keeps its patterns even if enrichment failed or timed out
+            shortlist = [full if full is not None else result for full, result in zip(enriched, shortlist)]
+            self._record_stage('Enrich', len(enriched), len(shortlist), started)
+        
+        return shortlist
+
+# =================== HEADLESS SCAN ===================
+
+# Short names accepted by the command line and config files for the sidebar's radio options
+ANALYSIS_MODES = {
+    'daily': "Daily Only (V6.0 Style)",
+    'weekly': "Weekly Only (New Feature)",
+    'combined': "Daily + Weekly Combined (Recommended)",
+}
+PATTERN_PRIORITIES = {
+    'all': "All Patterns (Comprehensive)",
+    'high-success': "High Success Rate Only (>80%)",
+    'pcs': "PCS Optimized (>90% suitability)",
+}
+SCAN_OUTPUT_FORMATS = ('json', 'csv', 'parquet')
+
+def default_scan_config(universe='fno'):
+    """Scan config with the sidebar's default settings, for scans run outside the UI"""
+    stocks = COMPLETE_NSE_FO_UNIVERSE if universe == 'fno' else get_nse_non_fno_stocks()
+    return {
+        'stocks_to_scan': list(stocks),
+        'rsi_min': 30,
+        'rsi_max': 80,
+        'adx_min': 20,
+        'ma_support': True,
+        'ma_type': 'EMA',
+        'ma_tolerance': 3,
+        'min_volume_ratio': 1.2,
+        'volume_breakout_ratio': 2.0,
+        'lookback_days': 20,
+        'pattern_strength_min': 65,
+        'pattern_filters': dict(PATTERN_FILTER_DEFAULTS),
+        'pattern_priority': PATTERN_PRIORITIES['all'],
+        'analysis_mode': ANALYSIS_MODES['combined'],
+        'enable_daily_analysis': True,
+        'enable_weekly_validation': True,
+        'show_charts': False,
+        'show_news': False,
+        'news_ttl_minutes': DEFAULT_NEWS_TTL_MINUTES,
+        'export_results': True,
+        'stocks_limit': len(stocks),
+        'max_workers': DEFAULT_SCAN_WORKERS,
+        'symbol_timeout': DEFAULT_SYMBOL_TIMEOUT,
+        'download_batch_size': DEFAULT_DOWNLOAD_BATCH_SIZE,
+        'panel_prefilter': True,
+        'enhancements': {key: True for key in ENHANCEMENT_KEYS},
+    }
+
+def apply_analysis_mode(config):
+    """Resolve short mode/priority names and set the daily/weekly flags the sidebar derives from the mode"""
+    config['analysis_mode'] = ANALYSIS_MODES.get(config['analysis_mode'], config['analysis_mode'])
+    config['pattern_priority'] = PATTERN_PRIORITIES.get(config['pattern_priority'], config['pattern_priority'])
+    config['enable_daily_analysis'] = config['analysis_mode'] != ANALYSIS_MODES['weekly']
+    config['enable_weekly_validation'] = config['analysis_mode'] != ANALYSIS_MODES['daily']
+    return config
+
+def run_scan(config, caches, progress_callback=None, status_callback=None):
+    """Run the staged scan for `config` and return the scan record shown by the UI and written by the CLI"""
+    scanner = ProfessionalPCSScanner(caches=caches)
+    engine = ParallelScanEngine(
+        scanner,
+        max_workers=config.get('max_workers', DEFAULT_SCAN_WORKERS),
+        symbol_timeout=config.get('symbol_timeout', DEFAULT_SYMBOL_TIMEOUT),
+        caches=caches
+    )
+    return {
+        'results': engine.run(
+            config['stocks_to_scan'], config,
+            progress_callback=progress_callback,
+            status_callback=status_callback
+        ),
+        'stage_stats': engine.stage_stats,
+        'timed_out': engine.timed_out,
+        'symbol_timeout': engine.symbol_timeout,
+        'market_sentiment': engine.market_sentiment,
+        'scanned_at': datetime.now(IST),
+        'scan_key': (get_trading_date(), config_fingerprint(config))
+    }
+
+def scan_results_frame(results):
+    """One row per (stock, pattern) with the stock's metrics and a summary of its enhancements"""
+    rows = []
+    for result in results:
+        enhancements = result.enhancements
+        stock = {
+            'symbol': result.symbol.replace('.NS', '').replace('^', ''),
+            'trading_date': result.trading_date,
+            'current_price': result.current_price,
+            'volume_ratio': result.volume_ratio,
+            'rsi': result.rsi,
+            'adx': result.adx,
+            'day_open': result.day_open,
+            'day_high': result.day_high,
+            'day_low': result.day_low,
+            'day_close': result.day_close,
+            'delivery_percentage': enhancements.get('delivery_volume', {}).get('delivery_percentage'),
+            'fno_consolidation': enhancements.get('fno_consolidation', {}).get('consolidation_detected'),
+            'breakout_pullback': enhancements.get('breakout_pullback', {}).get('pattern_detected'),
+            'sr_position': enhancements.get('enhanced_sr', {}).get('position_analysis', {}).get('position_strength'),
+        }
+        for pattern in result.patterns:
+            rows.append({
+                **stock,
+                'pattern': pattern['type'],
+                'strength': pattern['strength'],
+                'confidence': pattern['confidence'],
+                'timeframe': pattern.get('timeframe'),
+                'success_rate': pattern['success_rate'],
+                'pcs_suitability': pattern['pcs_suitability'],
+            })
+    return pd.DataFrame(rows)
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, ScanResult):
+        return value.to_dict()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def scan_output_format(path, output_format=None):
+    """Explicit format, else the one named by the file extension"""
+    output_format = output_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if output_format not in SCAN_OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format '{output_format}' (use one of {', '.join(SCAN_OUTPUT_FORMATS)})")
+    return output_format
+
+def write_scan_results(scan, path, output_format=None):
+    """Write a scan record as JSON (full detail) or as a CSV/Parquet table from scan_results_frame"""
+    output_format = scan_output_format(path, output_format)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if output_format == 'json':
+        payload = {
+            'scanned_at': scan['scanned_at'],
+            'trading_date': scan['scan_key'][0],
+            'stage_stats': scan['stage_stats'],
+            'timed_out': scan['timed_out'],
+            'results': scan['results'],
+        }
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle, indent=2, default=_json_default)
+    elif output_format == 'csv':
+        scan_results_frame(scan['results']).to_csv(path, index=False)
+    else:
+        scan_results_frame(scan['results']).to_parquet(path, index=False)
+    return path
+
+def _add_universe_arguments(parser):
+    parser.add_argument('--config', help='JSON file of scan settings')
+    parser.add_argument('--universe', choices=('fno', 'non-fno'), default='fno')
+    parser.add_argument('--symbols', help='Comma-separated symbols to scan instead of the universe')
+    parser.add_argument('--limit', dest='stocks_limit', type=int, metavar='N', help='Scan only the first N stocks')
+
+def _add_detection_arguments(parser):
+    parser.add_argument('--breakout-volume', dest='volume_breakout_ratio', type=float)
+    parser.add_argument('--lookback-days', dest='lookback_days', type=int)
+    parser.add_argument('--mode', dest='analysis_mode', choices=tuple(ANALYSIS_MODES))
+
+def _add_engine_arguments(parser):
+    parser.add_argument('--workers', dest='max_workers', type=int)
+    parser.add_argument('--timeout', dest='symbol_timeout', type=float)
+    parser.add_argument('--batch-size', dest='download_batch_size', type=int)
+
+def build_cli_parser():
+    parser = argparse.ArgumentParser(
+        prog='streamlit_app.py',
+        description="Run the PCS pattern scan without the Streamlit UI. Settings default to the sidebar's; "
+                    "a JSON config file (same keys as the scan config) overrides them, and flags override both."
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    scan = commands.add_parser('scan', help='Scan a stock universe and write the qualifying stocks')
+    scan.add_argument('-o', '--output', required=True, help='Output file; the format follows the extension unless --format is given')
+    scan.add_argument('--format', dest='output_format', choices=SCAN_OUTPUT_FORMATS)
+    _add_universe_arguments(scan)
+    scan.add_argument('--rsi-min', dest='rsi_min', type=float)
+    scan.add_argument('--rsi-max', dest='rsi_max', type=float)
+    scan.add_argument('--adx-min', dest='adx_min', type=float)
+    scan.add_argument('--no-ma-support', dest='ma_support', action='store_false', default=None)
+    scan.add_argument('--ma-type', dest='ma_type', choices=('EMA', 'SMA'))
+    scan.add_argument('--ma-tolerance', dest='ma_tolerance', type=float)
+    scan.add_argument('--min-volume-ratio', dest='min_volume_ratio', type=float)
+    _add_detection_arguments(scan)
+    scan.add_argument('--strength-min', dest='pattern_strength_min', type=float)
+    scan.add_argument('--patterns', help='Comma-separated pattern keys to detect; all others are disabled')
+    scan.add_argument('--priority', dest='pattern_priority', choices=tuple(PATTERN_PRIORITIES))
+    scan.add_argument('--enhancements', help="Comma-separated enhancements to run, or 'none'")
+    _add_engine_arguments(scan)
+    scan.add_argument('--no-prefilter', dest='panel_prefilter', action='store_false', default=None)
+    
+    precompute = commands.add_parser(
+        'precompute',
+        help="Write the trading date's end-of-day snapshot, which the app filters instead of rescanning"
+    )
+    _add_universe_arguments(precompute)
+    _add_detection_arguments(precompute)
+    _add_engine_arguments(precompute)
+    precompute.add_argument('--snapshot-dir', help=f'Snapshot directory (default {SNAPSHOT_DIR})')
+    precompute.add_argument('--force', action='store_true', help='Run even while the market is open')
+    return parser
+
+def _split_option(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def cli_scan_config(args):
+    """Scan config from the sidebar defaults, the optional config file and the command-line flags"""
+    config = default_scan_config(args.universe)
+    limited = args.stocks_limit is not None
+    if args.config:
+        with open(args.config, encoding='utf-8') as handle:
+            overrides = json.load(handle)
+        limited = limited or 'stocks_limit' in overrides
+        for key in ('pattern_filters', 'enhancements'):
+            config[key].update(overrides.pop(key, {}))
+        config.update(overrides)
+    
+    config.update({
+        key: value for key, value in vars(args).items()
+        if value is not None and key in config
+    })
+    if args.symbols:
+        config['stocks_to_scan'] = [symbol if symbol.endswith('.NS') or symbol.startswith('^') else f"{symbol}.NS"
+                                    for symbol in _split_option(args.symbols.upper())]
+    patterns = getattr(args, 'patterns', None)
+    if patterns:
+        enabled = set(_split_option(patterns))
+        unknown = enabled - set(config['pattern_filters'])
+        if unknown:
+            raise ValueError(f"Unknown pattern keys: {', '.join(sorted(unknown))}")
+        config['pattern_filters'] = {key: key in enabled for key in config['pattern_filters']}
+    enhancements = getattr(args, 'enhancements', None)
+    if enhancements:
+        enabled = set() if enhancements == 'none' else set(_split_option(enhancements))
+        unknown = enabled - set(ENHANCEMENT_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown enhancements: {', '.join(sorted(unknown))}")
+        config['enhancements'] = {key: key in enabled for key in ENHANCEMENT_KEYS}
+    
+    # The default limit is just the default universe's size; only an explicit one trims the list
+    if limited:
+        config['stocks_to_scan'] = config['stocks_to_scan'][:config['stocks_limit']]
+    config['stocks_limit'] = len(config['stocks_to_scan'])
+    return apply_analysis_mode(config)
+
+def _print_stage_stats(scan):
+    for stage in scan['stage_stats']:
+        print(f"{stage['stage']}: {stage['stocks_in']} -> {stage['stocks_out']} ({stage['seconds']:.1f}s)", file=sys.stderr)
+    if scan['timed_out']:
+        print(f"Skipped after timeout: {', '.join(scan['timed_out'])}", file=sys.stderr)
+
+def run_cli(argv=None):
+    """Command-line entry point: `python streamlit_app.py scan -o results.json [filters]` or `... precompute`"""
+    parser = build_cli_parser()
+    args = parser.parse_args(argv)
+    try:
+        output_format = scan_output_format(args.output, args.output_format) if args.command == 'scan' else None
+        config = cli_scan_config(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    
+    report = lambda message: print(message, file=sys.stderr)
+    if args.command == 'precompute':
+        if is_market_open() and not args.force:
+            print("The market is open, so today's session is incomplete; run after the close or pass --force", file=sys.stderr)
+            return 1
+        snapshot, path = precompute_snapshot(config, create_scan_caches(), ScanSnapshotStore(args.snapshot_dir), status_callback=report)
+        _print_stage_stats(snapshot)
+        print(f"Snapshot of {len(snapshot['results'])} stocks for {snapshot['trading_date']} -> {path}")
+        if not snapshot_is_final(snapshot):
+            print("Note: taken before the session closed, so the app keeps scanning live until it is re-run after the close")
+        return 0
+    
+    scan = run_scan(config, create_scan_caches(), status_callback=report)
+    path = write_scan_results(scan, args.output, output_format)
+    _print_stage_stats(scan)
+    print(f"{len(scan['results'])} stocks qualified on {scan['scan_key'][0]} -> {path}")
+    return 0
+
+# =================== EOD SNAPSHOTS ===================
+
+SNAPSHOT_DIR = os.environ.get('PCS_SNAPSHOT_DIR', os.path.join(DATA_DIR, 'snapshots'))
+SNAPSHOT_RETENTION_DAYS = 30
+SNAPSHOT_TIMESTAMP_KEY = '$timestamp'  # Tags serialized pd.Timestamp values so loading restores their type
+
+def _snapshot_default(value):
+    if isinstance(value, pd.Timestamp):
+        return {SNAPSHOT_TIMESTAMP_KEY: value.isoformat()}
+    return _json_default(value)
+
+def _snapshot_object_hook(fields):
+    if len(fields) == 1 and SNAPSHOT_TIMESTAMP_KEY in fields:
+        return pd.Timestamp(fields[SNAPSHOT_TIMESTAMP_KEY])
+    return fields
+
+def snapshot_is_final(snapshot, now=None):
+    """True once the market is closed and the snapshot was taken after its session's close, so no bar in it can still change"""
+    now = now or datetime.now(IST)
+    session = datetime.strptime(snapshot['trading_date'], '%Y-%m-%d')
+    session_close = IST.localize(session.replace(hour=MARKET_CLOSE_IST[0], minute=MARKET_CLOSE_IST[1]))
+    return not is_market_open(now) and snapshot['created_at'] >= session_close
+
+class ScanSnapshotStore:
+    """
+    Dated end-of-day snapshots written by `python streamlit_app.py precompute`: the unfiltered
+    detections and every enhancement for a universe under one set of detection settings, as
+    one JSON file per trading date and detection fingerprint. Loaded snapshots are kept in
+    memory until their file changes.
+    """
+    
+    def __init__(self, root=None):
+        self.root = root or SNAPSHOT_DIR
+        self._loaded = {}
+        self._lock = threading.Lock()
+    
+    def _path(self, trading_date, fingerprint):
+        return os.path.join(self.root, f"eod_{trading_date}_{fingerprint[:12]}.json")
+    
+    def save(self, snapshot):
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(snapshot['trading_date'], snapshot['detection_fingerprint'])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(snapshot, handle, default=_snapshot_default)
+        os.replace(tmp_path, path)  # Atomic swap so the app never reads a partial snapshot
+        self._prune()
+        return path
+    
+    def load(self, trading_date, fingerprint):
+        """Snapshot for the trading date and detection fingerprint, with ScanResult records; None if there is none"""
+        path = self._path(trading_date, fingerprint)
+        try:
+            modified = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._loaded.get(path)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+        
+        try:
+            with open(path, encoding='utf-8') as handle:
+                snapshot = json.load(handle, object_hook=_snapshot_object_hook)
+            snapshot['results'] = [ScanResult(**fields) for fields in snapshot['results']]
+            snapshot['created_at'] = datetime.fromisoformat(snapshot['created_at'])
+            sentiment = snapshot.get('market_sentiment')
+            if isinstance(sentiment, dict) and 'as_of' in sentiment:
+                sentiment['as_of'] = datetime.fromisoformat(sentiment['as_of'])
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+        with self._lock:
+            self._loaded = {path: (modified, snapshot)}  # Only the current snapshot is worth keeping
+        return snapshot
+    
+    def _prune(self):
+        cutoff = time.time() - SNAPSHOT_RETENTION_DAYS * 86400
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if name.startswith('eod_') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+def precompute_snapshot(config, caches, store, status_callback=None):
+    """Unfiltered detections and every enhancement for the config's universe, saved as the trading date's snapshot"""
+    config = {**config, 'enhancements': {key: True for key in ENHANCEMENT_KEYS}}
+    engine = ParallelScanEngine(
+        ProfessionalPCSScanner(caches=caches),
+        max_workers=config.get('max_workers', DEFAULT_SCAN_WORKERS),
+        symbol_timeout=config.get('symbol_timeout', DEFAULT_SYMBOL_TIMEOUT),
+        caches=caches
+    )
+    records = engine.run_unfiltered(config['stocks_to_scan'], config, status_callback=status_callback)
+    snapshot = {
+        'trading_date': str(get_trading_date()),
+        'created_at': datetime.now(IST),
+        'detection_fingerprint': detection_fingerprint(config),
+        'universe': list(config['stocks_to_scan']),
+        'stage_stats': engine.stage_stats,
+        'timed_out': engine.timed_out,
+        'symbol_timeout': engine.symbol_timeout,
+        'market_sentiment': engine.market_sentiment,
+        'results': records,
+    }
+    return snapshot, store.save(snapshot)
+
+def scan_from_snapshot(snapshot, config, scanner):
+    """The scan record for `config`, filtered in memory from a snapshot; None when the snapshot is not final or does not cover its universe"""
+    symbols = set(config['stocks_to_scan'])
+    if not snapshot_is_final(snapshot) or not symbols.issubset(snapshot['universe']):
+        return None
+    
+    started = time.monotonic()
+    results = []
+    for record in snapshot['results']:
+        if record.symbol in symbols:
+            result = scanner.filter_detection(record, config)
+            if result is not None:
+                results.append(result)
+    
+    return {
+        'results': results,
+        'stage_stats': [{
+            'stage': 'Snapshot',
+            'stocks_in': len(symbols),
+            'stocks_out': len(results),
+            'seconds': round(time.monotonic() - started, 2)
+        }],
+        'timed_out': [symbol for symbol in snapshot['timed_out'] if symbol in symbols],
+        'symbol_timeout': snapshot['symbol_timeout'],
+        'market_sentiment': snapshot['market_sentiment'],
+        'scanned_at': snapshot['created_at'],
+        'scan_key': (get_trading_date(), config_fingerprint(config))
+    }
+
+# =================== BACKGROUND NEWS FEED ===================
+
+NEWS_MAX_CONCURRENT = 4  # Headline lookups in flight at once
+NEWS_CACHE_MAX_ENTRIES = 500
+DEFAULT_NEWS_TTL_MINUTES = 30
+MAX_NEWS_TTL_MINUTES = 240
+NEWS_POLL_SECONDS = 2  # How often the page checks for headlines still being fetched
+NEWS_RETRY_SECONDS = 60  # A lookup that could not reach the news source is retried after this long
+
+class NewsFeed:
+    """
+    Headline lookups run off the scan on a small thread pool, at most `max_concurrent` at a time.
+    Results are cached per symbol together with their fetch time, so each reader applies its own
+    TTL; a symbol with fresh news or a lookup already in flight is not fetched again. Failed
+    lookups only count as fresh for NEWS_RETRY_SECONDS.
+    """
+    
+    def __init__(self, max_concurrent=NEWS_MAX_CONCURRENT, max_entries=NEWS_CACHE_MAX_ENTRIES):
+        self._cache = TTLCache(max_entries, ttl=MAX_NEWS_TTL_MINUTES * 60)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='news')
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._scanner = ProfessionalPCSScanner()  # Only its HTTP session and news parsing are used
+    
+    def get(self, symbol, ttl_seconds):
+        """Cached news for `symbol` fetched within the last `ttl_seconds`, else None"""
+        entry = self._cache.get(symbol)
+        if entry is None:
+            return None
+        fetched_at, news_data = entry
+        if news_data.get('lookup_failed'):
+            ttl_seconds = min(ttl_seconds, NEWS_RETRY_SECONDS)
+        if time.monotonic() - fetched_at > ttl_seconds:
+            return None
+        return news_data
+    
+    def request(self, symbol, ttl_seconds):
+        """Start a background lookup unless fresh news is cached; returns the pending future, or None when cached"""
+        with self._lock:
+            # The cache check and the submit share the lock with _fetch's publish, so a lookup that
+            # finishes in between is seen as cached instead of being submitted again
+            if self.get(symbol, ttl_seconds) is not None:
+                return None
+            future = self._in_flight.get(symbol)
+            if future is None:
+                future = self._executor.submit(self._fetch, symbol)
+                self._in_flight[symbol] = future
+            return future
+    
+    def _fetch(self, symbol):
+        try:
+            clean_symbol = symbol.replace('.NS', '').replace('^', '')
+            news_data = self._scanner.get_fundamental_news(symbol, clean_symbol)
+        except Exception:
+            news_data = {'news_items': [], 'overall_sentiment': 'neutral', 'news_count': 0, 'lookup_failed': True}
+        with self._lock:
+            self._cache.set(symbol, (time.monotonic(), news_data))
+            self._in_flight.pop(symbol, None)
+        return news_data
+
+
+def render_news_card(news_data):
+    """Today's headlines and overall sentiment for one result"""
+    sentiment_emoji = "🟢" if news_data['overall_sentiment'] == 'positive' else "🔴" if news_data['overall_sentiment'] == 'negative' else "🟡"
+    
+    st.markdown(f"""
+    <div class="news-card">
+        <h4>{sentiment_emoji} Today's News - {news_data['overall_sentiment'].upper()} Sentiment</h4>
+    """, unsafe_allow_html=True)
+    
+    for news_item in news_data['news_items'][:2]:
+        relevance_emoji = "🔥" if news_item['relevance'] == 'high' else "⚡" if news_item['relevance'] == 'medium' else "📄"
+        st.markdown(f"**{relevance_emoji}** {news_item['headline'][:120]}...")
+    
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def poll_pending_news(pending_futures):
+    """
+    Re-run the page as lookups finish. The page itself never waits on news: a fragment checks the
+    futures every NEWS_POLL_SECONDS and re-runs the page as soon as any has finished, which renders
+    the newly cached cards and polls only the lookups still running.
+    """
+    if not pending_futures:
+        return
+    
+    @st.fragment(run_every=NEWS_POLL_SECONDS)
+    def news_poller():
+        if any(future.done() for future in pending_futures):
+            st.rerun()
+    
+    news_poller()
+
+
 def create_professional_sidebar():
     """Create professional sidebar with Angel One styling"""
     with st.sidebar:
@@ -4421,8 +6483,24 @@ def create_professional_sidebar():
             else:  # "All Stocks"
                 stocks_limit = len(stocks_to_scan)
             
+            col1, col2 = st.columns(2)
+            with col1:
+                max_workers = st.slider("Parallel Workers:", 1, 32, DEFAULT_SCAN_WORKERS,
+                                        help="Number of stocks analyzed concurrently")
+            with col2:
+                symbol_timeout = st.slider("Per-Stock Timeout (s):", 5, 120, DEFAULT_SYMBOL_TIMEOUT, 5,
+                                           help="Skip a stock whose analysis takes longer than this")
+            
+            download_batch_size = st.slider("Download Batch Size:", 25, 250, DEFAULT_DOWNLOAD_BATCH_SIZE, 25,
+                                            help="Stocks fetched per batched price-data request")
+            
+            panel_prefilter = st.checkbox("Panel Pre-filter", value=True,
+                                          help="Stage 1: screen volume, RSI, ADX and MA support for the whole universe in one vectorized pass before pattern detection")
+            
             show_charts = st.checkbox("Show Charts", value=True)
             show_news = st.checkbox("Show News", value=True)
+            news_ttl_minutes = st.slider("News Cache (minutes):", 5, MAX_NEWS_TTL_MINUTES, DEFAULT_NEWS_TTL_MINUTES, 5,
+                                         help="Headlines are fetched in the background and reused for this long")
             export_results = st.checkbox("Export Results", value=False)
         
         # === ENHANCEMENTS SECTION ===
@@ -4444,8 +6522,7 @@ def create_professional_sidebar():
         # Market Sentiment
         st.markdown("### 🌍 Market Sentiment")
         
-        scanner = ProfessionalPCSScanner()
-        sentiment_data = scanner.get_market_sentiment_indicators()
+        sentiment_data = get_market_sentiment_snapshot()
         
         overall_sentiment = sentiment_data.get('overall', {})
         sentiment_level = overall_sentiment.get('sentiment', 'NEUTRAL')
@@ -4468,9 +6545,9 @@ def create_professional_sidebar():
             nifty_data = sentiment_data['nifty']
             st.metric("Nifty 50", f"{nifty_data['current']:.0f}", f"{nifty_data['change_1d']:+.2f}%")
         
-        # Current time
+        # Snapshot time
         ist = pytz.timezone('Asia/Kolkata')
-        current_time = datetime.now(ist)
+        current_time = sentiment_data.get('as_of', datetime.now(ist))
         st.markdown(f"**Updated:** {current_time.strftime('%H:%M IST')}")
         
         
@@ -4510,8 +6587,13 @@ def create_professional_sidebar():
             'enable_weekly_validation': enable_weekly_validation,
             'show_charts': show_charts,
             'show_news': show_news,
+            'news_ttl_minutes': news_ttl_minutes,
             'export_results': export_results,
             'stocks_limit': stocks_limit,
+            'max_workers': max_workers,
+            'symbol_timeout': symbol_timeout,
+            'download_batch_size': download_batch_size,
+            'panel_prefilter': panel_prefilter,
             'market_sentiment': sentiment_data
         ,
         
@@ -4539,145 +6621,80 @@ def create_main_scanner_tab(config):
     with col3:
         st.markdown(f"**Scanning: {len(config['stocks_to_scan'])} stocks**")
     
+    caches = get_scan_caches()
+    scan_key = (get_trading_date(), config_fingerprint(config))
+    
     if scan_button:
-        scanner = ProfessionalPCSScanner()
-        
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_container = st.empty()
-        
-        results = []
-        
-        for i, symbol in enumerate(config['stocks_to_scan']):
-            progress = (i + 1) / len(config['stocks_to_scan'])
-            progress_bar.progress(progress)
-            
-            clean_symbol = symbol.replace('.NS', '').replace('^', '')
-            status_container.info(f"🔍 Analyzing {clean_symbol} ({i+1}/{len(config['stocks_to_scan'])})")
-            
-            try:
-                # Get recent data focused on current day
-                data = scanner.get_stock_data(symbol, period="3mo")
-                if data is None:
-                    continue
-                
-                # Check volume (current day focused)
-                volume_ok, volume_ratio, volume_details = scanner.check_volume_criteria(data, config['min_volume_ratio'])
-                if not volume_ok:
-                    continue
-                
-                # Detect patterns (current day confirmation)
-                patterns = scanner.detect_patterns(data, symbol, config)
-                if not patterns:
-                    continue
-                
-                # Get current metrics
-                current_price = data['Close'].iloc[-1]
-                current_rsi = data['RSI'].iloc[-1]
-                current_adx = data['ADX'].iloc[-1]
-                
-                # Get news if enabled
-                news_data = None
-                if config['show_news']:
-                    try:
-                        stock_name = clean_symbol
-                        news_data = scanner.get_fundamental_news(symbol, stock_name)
-                    except:
-                        news_data = None
-                
-                # =================== PROCESS ENHANCEMENTS ===================
-                enhancement_results = {}
-                
-                if config.get('enhancements', {}).get('delivery_volume', False):
-                    try:
-                        delivery_analysis = scanner.analyze_delivery_volume_percentage(symbol)
-                        enhancement_results['delivery_volume'] = delivery_analysis
-                    except Exception as e:
-                        enhancement_results['delivery_volume'] = {
-                            'delivery_percentage': None,
-                            'delivery_analysis': f'Error: {str(e)}',
-                            'delivery_signals': [],
-                            'confidence': 'Low'
-                        }
-                
-                if config.get('enhancements', {}).get('fno_consolidation', False):
-                    try:
-                        consolidation_analysis = scanner.detect_fno_consolidation_near_resistance(
-                            data, symbol, lookback_days=20
-                        )
-                        enhancement_results['fno_consolidation'] = consolidation_analysis
-                    except Exception as e:
-                        enhancement_results['fno_consolidation'] = {
-                            'consolidation_detected': False,
-                            'analysis': f'Error: {str(e)}',
-                            'signals': []
-                        }
-                
-                if config.get('enhancements', {}).get('breakout_pullback', False):
-                    try:
-                        breakout_pullback_analysis = scanner.detect_breakout_pullback_strong_green(
-                            data, lookback_days=30
-                        )
-                        enhancement_results['breakout_pullback'] = breakout_pullback_analysis
-                    except Exception as e:
-                        enhancement_results['breakout_pullback'] = {
-                            'pattern_detected': False,
-                            'analysis': f'Error: {str(e)}',
-                            'signals': []
-                        }
-                
-                if config.get('enhancements', {}).get('enhanced_sr', False):
-                    try:
-                        sr_analysis = scanner.enhanced_support_resistance_analysis(
-                            data, lookback_days=50
-                        )
-                        enhancement_results['enhanced_sr'] = sr_analysis
-                    except Exception as e:
-                        enhancement_results['enhanced_sr'] = {
-                            'analysis_available': False,
-                            'message': f'Error: {str(e)}',
-                            'support_levels': [],
-                            'resistance_levels': []
-                        }
-                
-                # Create the stock result with all data including enhancements
-                stock_result = {
-                    'symbol': symbol,
-                    'current_price': current_price,
-                    'volume_ratio': volume_ratio,
-                    'volume_details': volume_details,
-                    'rsi': current_rsi,
-                    'adx': current_adx,
-                    'patterns': patterns,
-                    'data': data,
-                    'news_data': news_data
-                }
-                
-                # Add enhancement results if any
-                if enhancement_results:
-                    stock_result['enhancements'] = enhancement_results
-                
-                results.append(stock_result)
-                
-            except Exception as e:
-                continue
+        scan = caches['scans'].get(scan_key)
         
-        # Clear progress
-        progress_bar.empty()
-        status_container.empty()
+        if scan is not None:
+            st.info(f"⚡ Settings unchanged - showing the scan from {scan['scanned_at'].strftime('%H:%M:%S')} IST")
+        else:
+            # After the close, the precomputed end-of-day snapshot is filtered in memory instead of rescanning
+            snapshot = caches['snapshots'].load(scan_key[0], detection_fingerprint(config))
+            if snapshot is not None:
+                scan = scan_from_snapshot(snapshot, config, ProfessionalPCSScanner(caches=caches))
+            if scan is not None:
+                st.info(f"⚡ Filtered the end-of-day snapshot from {scan['scanned_at'].strftime('%H:%M')} IST")
+        
+        if scan is None:
+            # Progress tracking
+            progress_bar = st.progress(0)
+            status_container = st.empty()
+            
+            def update_progress(completed, total, symbol):
+                progress_bar.progress(completed / total)
+                clean_symbol = symbol.replace('.NS', '').replace('^', '')
+                status_container.info(f"🔍 Analyzed {clean_symbol} ({completed}/{total})")
+            
+            scan = run_scan(config, caches, progress_callback=update_progress, status_callback=status_container.info)
+            # Scans with abandoned symbols are incomplete, so they are not reused
+            if not scan['timed_out']:
+                caches['scans'].set(scan_key, scan)
+            
+            # Clear progress
+            progress_bar.empty()
+            status_container.empty()
+        
+        # Keep the scan for this session so widget reruns re-render it without rescanning
+        st.session_state['last_scan'] = scan
+    
+    scan = st.session_state.get('last_scan')
+    if scan is not None:
+        scanner = ProfessionalPCSScanner(caches=caches)  # Used for chart rendering only
+        results = list(scan['results'])
+        news_feed = caches['news']
+        news_ttl = config.get('news_ttl_minutes', DEFAULT_NEWS_TTL_MINUTES) * 60
+        pending_news = []
+        
+        if not scan_button and scan.get('scan_key') != scan_key:
+            st.caption(f"ℹ️ Showing the scan from {scan['scanned_at'].strftime('%H:%M:%S')} IST - settings or trading date have changed since, click Scan to refresh")
+        
+        if scan['timed_out']:
+            st.warning(f"⏱️ {len(scan['timed_out'])} stocks skipped after exceeding the {scan['symbol_timeout']}s per-stock timeout")
+        
+        # Show where the funnel narrows and where the time goes
+        if scan['stage_stats']:
+            st.caption("🔻 Scan funnel: " + " → ".join(
+                f"{stage['stage']} {stage['stocks_out']} ({stage['seconds']:.1f}s)" for stage in scan['stage_stats']
+            ))
+        
+        scan_sentiment = (scan.get('market_sentiment') or {}).get('overall')
+        if scan_sentiment:
+            st.caption(f"🌍 Market at scan time: {scan_sentiment['sentiment']} - {scan_sentiment['pcs_recommendation']}")
         
         # Display results
         if results:
             # Sort by pattern strength and current day confirmation
-            results.sort(key=lambda x: max(p['strength'] for p in x['patterns']), reverse=True)
+            results.sort(key=lambda x: x.max_strength, reverse=True)
             
             st.success(f"🎉 Found **{len(results)} stocks** with current day confirmed patterns!")
             
             # Summary metrics
-            total_patterns = sum(len(r['patterns']) for r in results)
-            avg_strength = np.mean([p['strength'] for r in results for p in r['patterns']])
-            current_day_breakouts = sum(1 for r in results for p in r['patterns'] if 'Current Day' in p['type'])
-            high_confidence = sum(1 for r in results for p in r['patterns'] if p['confidence'] == 'HIGH')
+            total_patterns = sum(len(r.patterns) for r in results)
+            avg_strength = np.mean([p['strength'] for r in results for p in r.patterns])
+            current_day_breakouts = sum(1 for r in results for p in r.patterns if 'Current Day' in p['type'])
+            high_confidence = sum(1 for r in results for p in r.patterns if p['confidence'] == 'HIGH')
             
             col1, col2, col3, col4 = st.columns(4)
             with col1:
@@ -4691,62 +6708,55 @@ def create_main_scanner_tab(config):
             
             # Display results
             for result in results:
-                max_strength = max(p['strength'] for p in result['patterns'])
+                max_strength = result.max_strength
                 overall_confidence = 'HIGH' if max_strength >= 85 else 'MEDIUM' if max_strength >= 70 else 'LOW'
                 
                 # Check for current day breakout
-                has_current_breakout = any('Current Day' in p['type'] for p in result['patterns'])
+                has_current_breakout = any('Current Day' in p['type'] for p in result.patterns)
                 current_indicator = " 🔥 TODAY!" if has_current_breakout else ""
                 
-                # Check for news
-                has_news = result.get('news_data') and result['news_data']['news_count'] > 0
+                # News is looked up in the background; cached headlines show at once, the rest as they arrive
+                news_data = None
+                news_future = None
+                if config['show_news']:
+                    news_future = news_feed.request(result.symbol, news_ttl)
+                    news_data = news_feed.get(result.symbol, news_ttl)
+                has_news = news_data is not None and news_data['news_count'] > 0
                 news_indicator = " 📰" if has_news else ""
                 
                 with st.expander(
-                    f"📈 {result['symbol'].replace('.NS', '').replace('^', '')} - {overall_confidence}{current_indicator}{news_indicator}", 
+                    f"📈 {result.symbol.replace('.NS', '').replace('^', '')} - {overall_confidence}{current_indicator}{news_indicator}", 
                     expanded=True
                 ):
                     
                     # Stock metrics
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
-                        st.metric("💰 Current Price", f"₹{result['current_price']:.2f}")
+                        st.metric("💰 Current Price", f"₹{result.current_price:.2f}")
                     with col2:
-                        volume_color = "inverse" if result['volume_ratio'] >= 2 else "normal"
-                        st.metric("📊 Volume Today", f"{result['volume_ratio']:.2f}x", delta_color=volume_color)
+                        volume_color = "inverse" if result.volume_ratio >= 2 else "normal"
+                        st.metric("📊 Volume Today", f"{result.volume_ratio:.2f}x", delta_color=volume_color)
                     with col3:
-                        st.metric("📈 RSI", f"{result['rsi']:.1f}")
+                        st.metric("📈 RSI", f"{result.rsi:.1f}")
                     with col4:
-                        st.metric("⚡ ADX", f"{result['adx']:.1f}")
+                        st.metric("⚡ ADX", f"{result.adx:.1f}")
                     
                     # Current day trading info
-                    current_day_data = result['data'].iloc[-1]
-                    trading_date = current_day_data.name.strftime('%Y-%m-%d')
-                    
                     st.markdown(f"""
-                    **🗓️ Trading Date:** {trading_date} | 
-                    **📊 Day Range:** ₹{current_day_data['Low']:.2f} - ₹{current_day_data['High']:.2f} |
-                    **💹 Day Change:** {((current_day_data['Close'] - current_day_data['Open']) / current_day_data['Open'] * 100):+.2f}%
+                    **🗓️ Trading Date:** {result.trading_date} | 
+                    **📊 Day Range:** ₹{result.day_low:.2f} - ₹{result.day_high:.2f} |
+                    **💹 Day Change:** {((result.day_close - result.day_open) / result.day_open * 100):+.2f}%
                     """)
                     
                     # NEWS ANALYSIS
                     if has_news:
-                        news_data = result['news_data']
-                        sentiment_emoji = "🟢" if news_data['overall_sentiment'] == 'positive' else "🔴" if news_data['overall_sentiment'] == 'negative' else "🟡"
-                        
-                        st.markdown(f"""
-                        <div class="news-card">
-                            <h4>{sentiment_emoji} Today's News - {news_data['overall_sentiment'].upper()} Sentiment</h4>
-                        """, unsafe_allow_html=True)
-                        
-                        for news_item in news_data['news_items'][:2]:
-                            relevance_emoji = "🔥" if news_item['relevance'] == 'high' else "⚡" if news_item['relevance'] == 'medium' else "📄"
-                            st.markdown(f"**{relevance_emoji}** {news_item['headline'][:120]}...")
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
+                        render_news_card(news_data)
+                    elif news_future is not None:
+                        st.caption("📰 Fetching today's news...")
+                        pending_news.append(news_future)
                     
                     # Pattern details
-                    for pattern in result['patterns']:
+                    for pattern in result.patterns:
                         confidence_emoji = "🟢" if pattern['confidence'] == 'HIGH' else "🟡" if pattern['confidence'] == 'MEDIUM' else "🔴"
                         
                         if pattern.get('special') == 'CURRENT_DAY_BREAKOUT':
@@ -4839,7 +6849,7 @@ def create_main_scanner_tab(config):
                             """, unsafe_allow_html=True)
                     
                     # =================== DISPLAY ENHANCEMENTS ===================
-                    enhancements = result.get('enhancements', {})
+                    enhancements = result.enhancements
                     
                     if enhancements:
                         st.markdown("### 🚀 **Enhancement Analysis**")
@@ -4856,7 +6866,7 @@ def create_main_scanner_tab(config):
                                     st.markdown(f"""
                                     <div class="pattern-card" style="border-left-color: {confidence_color};">
                                         <h4>📊 Delivery Volume Analysis</h4>
-                                        <p><strong>Estimated Delivery:</strong> {delivery.get('delivery_percentage', 0):.1f}%</p>
+                                        <p><strong>{'NSE Delivery' if delivery.get('source') else 'Estimated Delivery'}:</strong> {delivery.get('delivery_percentage', 0):.1f}%</p>
                                         <p><strong>Analysis:</strong> {delivery.get('delivery_analysis', 'N/A')}</p>
                                         <p><strong>Confidence:</strong> <span style="color: {confidence_color};">{delivery.get('confidence', 'Low')}</span></p>
                                         <div style="font-size: 0.9rem; margin-top: 8px;">
@@ -4923,6 +6933,7 @@ def create_main_scanner_tab(config):
                                     resistance_count = len(sr.get('resistance_levels', []))
                                     position = sr.get('position_analysis', {}).get('position_strength', 'N/A')
                                     breakout_prob = sr.get('breakout_analysis', {}).get('breakout_probability', 'N/A')
+                                    volume_profile = sr.get('volume_profile')
                                     
                                     st.markdown(f"""
                                     <div class="news-card">
@@ -4930,6 +6941,7 @@ def create_main_scanner_tab(config):
                                         <p><strong>Support Levels:</strong> {support_count}</p>
                                         <p><strong>Resistance Levels:</strong> {resistance_count}</p>
                                         <p><strong>Position:</strong> {position}</p>
+                                        {f"<p><strong>Volume POC:</strong> ₹{volume_profile['poc']:.2f} (value area ₹{volume_profile['value_area_low']:.2f} - ₹{volume_profile['value_area_high']:.2f})</p>" if volume_profile else ''}
                                         <p><strong>Breakout Probability:</strong> <span style="color: var(--primary-green);">{breakout_prob}</span></p>
                                         <div style="font-size: 0.9rem; margin-top: 8px;">
                                             {''.join(f'<div>• {insight}</div>' for insight in sr.get('analysis_summary', {}).get('key_insights', []))}
@@ -4949,11 +6961,13 @@ def create_main_scanner_tab(config):
                     # Chart with current day focus
                     if config['show_charts']:
                         st.markdown("#### 📊 Current Day Chart Analysis")
+                        # The frame is re-derived from the shared price/indicator caches
+                        chart_data = scanner.get_stock_data(result.symbol, period=result.data_period)
                         chart = scanner.create_tradingview_chart(
-                            result['data'], 
-                            result['symbol'], 
-                            result['patterns'][0] if result['patterns'] else None
-                        )
+                            chart_data, 
+                            result.symbol, 
+                            result.patterns[0] if result.patterns else None
+                        ) if chart_data is not None else None
                         if chart:
                             st.plotly_chart(chart, use_container_width=True)
             
@@ -4975,6 +6989,9 @@ def create_main_scanner_tab(config):
             
             with col2:
                 st.info(f"📋 {len(results)} stocks will be exported")
+            
+            # Headlines still being fetched show up on a rerun as their lookups finish
+            poll_pending_news(pending_news)
         
         else:
             st.warning("🔍 No current day patterns found. Try adjusting filters.")
@@ -5010,9 +7027,8 @@ def main():
     with tab2:
         st.markdown("### 📊 Market Intelligence Dashboard")
         
-        # Get market data
-        scanner = ProfessionalPCSScanner()
-        sentiment_data = scanner.get_market_sentiment_indicators()
+        # Get market data (shared snapshot, refreshed at most every few minutes)
+        sentiment_data = get_market_sentiment_snapshot()
         
         # Market Overview
         col1, col2, col3 = st.columns(3)
@@ -5076,4 +7092,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # `streamlit run` executes the script with a script-run context; plain `python` runs the CLI
+    if get_script_run_ctx(suppress_warning=True) is None:
+        sys.exit(run_cli())
     main()
@@ -0,0 +1,24 @@
+"""Headless CLI scan configs."""
+import json
+
+import streamlit_app as app
+
+
+def cli_config(tmp_path, overrides, *flags):
+    path = tmp_path / "scan.json"
+    path.write_text(json.dumps(overrides))
+    args = app.build_cli_parser().parse_args(["scan", "-o", str(tmp_path / "out.json"), "--config", str(path), *flags])
+    return app.cli_scan_config(args)
+
+
+def test_config_file_universe_is_not_cut_to_default_size(tmp_path):
+    symbols = [f"S{i}.NS" for i in range(len(app.default_scan_config()['stocks_to_scan']) + 25)]
+    config = cli_config(tmp_path, {'stocks_to_scan': symbols})
+    assert config['stocks_to_scan'] == symbols
+    assert config['stocks_limit'] == len(symbols)
+
+
+def test_explicit_limits_trim_the_universe(tmp_path):
+    symbols = [f"S{i}.NS" for i in range(40)]
+    assert cli_config(tmp_path, {'stocks_to_scan': symbols, 'stocks_limit': 10})['stocks_to_scan'] == symbols[:10]
+    assert cli_config(tmp_path, {'stocks_to_scan': symbols}, "--limit", "5")['stocks_to_scan'] == symbols[:5]
@@ -0,0 +1,105 @@
+"""The NumPy indicator kernel must reproduce the `ta` indicators it replaced."""
+import numpy as np
+import pandas as pd
+import pytest
+import ta
+
+import streamlit_app as app
+
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(scope="module")
+def bars():
+    rng = np.random.default_rng(7)
+    n = 260
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.015, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.008, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.008, n)))
+    index = pd.bdate_range("2025-01-01", periods=n)
+    return pd.DataFrame({"High": high, "Low": low, "Close": close}, index=index)
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_allclose(actual, np.asarray(expected, dtype=float), rtol=0, atol=TOLERANCE, equal_nan=True)
+
+
+def arrays(frame):
+    return (frame[column].to_numpy(dtype=float) for column in ("High", "Low", "Close"))
+
+
+def test_rsi_matches_ta(bars):
+    _, _, close = arrays(bars)
+    assert_matches(app.rsi(close), ta.momentum.RSIIndicator(bars["Close"], window=app.RSI_WINDOW).rsi())
+
+
+def test_adx_matches_ta(bars):
+    high, low, close = arrays(bars)
+    expected = ta.trend.ADXIndicator(bars["High"], bars["Low"], bars["Close"], window=app.ADX_WINDOW).adx()
+    assert_matches(app.adx(high, low, close), expected)
+
+
+def test_atr_matches_ta(bars):
+    high, low, close = arrays(bars)
+    expected = ta.volatility.AverageTrueRange(bars["High"], bars["Low"], bars["Close"], window=app.ATR_WINDOW).average_true_range()
+    assert_matches(app.atr(high, low, close), expected)
+
+
+def test_macd_matches_ta(bars):
+    _, _, close = arrays(bars)
+    indicator = ta.trend.MACD(bars["Close"], window_slow=app.MACD_SLOW, window_fast=app.MACD_FAST, window_sign=app.MACD_SIGNAL)
+    macd_line, macd_signal, macd_hist = app.macd(close)
+    assert_matches(macd_line, indicator.macd())
+    assert_matches(macd_signal, indicator.macd_signal())
+    assert_matches(macd_hist, indicator.macd_diff())
+
+
+@pytest.mark.parametrize("span", [10, 20])
+def test_ema_matches_ta(bars, span):
+    _, _, close = arrays(bars)
+    assert_matches(app.ema(close, span), ta.trend.EMAIndicator(bars["Close"], window=span).ema_indicator())
+
+
+def test_weekly_kernel_matches_ta(bars):
+    weekly = bars.resample("W-FRI").agg({"High": "max", "Low": "min", "Close": "last"}).dropna()
+    assert len(weekly) >= 2 * app.ADX_WINDOW
+    columns = app.compute_weekly_indicators(*arrays(weekly))
+    assert_matches(columns["RSI"], ta.momentum.RSIIndicator(weekly["Close"], window=app.RSI_WINDOW).rsi())
+    assert_matches(columns["ADX"], ta.trend.ADXIndicator(weekly["High"], weekly["Low"], weekly["Close"], window=app.ADX_WINDOW).adx())
+    assert_matches(columns["EMA_10"], ta.trend.EMAIndicator(weekly["Close"], window=10).ema_indicator())
+    assert_matches(columns["MACD"], ta.trend.MACD(weekly["Close"]).macd())
+
+
+def test_panel_columns_match_single_symbol(bars):
+    high, low, close = arrays(bars)
+    panel = app.compute_daily_indicators(*(np.column_stack([values, values * 1.5]) for values in (high, low, close)))
+    single = app.compute_daily_indicators(high, low, close)
+    for name in ("RSI", "ADX", "ATR", "MACD", "EMA_20"):
+        assert_matches(panel[name][:, 0], single[name])
+
+
+def stored_scanner(tmp_path, periods):
+    rng = np.random.default_rng(3)
+    index = pd.bdate_range(end=app.get_trading_date(), periods=periods)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.015, len(index))))
+    frame = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                          "Volume": rng.integers(100_000, 300_000, len(index)).astype(float)}, index=index)
+    store = app.OHLCVStore(root=str(tmp_path))
+    store.save_full_history("TEST.NS", frame, app.HISTORY_PERIOD)  # Written now, so served without a download
+    return app.ProfessionalPCSScanner(store=store)
+
+
+def test_weekly_frame_available_with_default_history(tmp_path):
+    weekly = stored_scanner(tmp_path, 260).get_weekly_stock_data("TEST.NS")
+    assert weekly is not None
+    assert not np.isnan(weekly["ADX"].iloc[-1])
+
+
+def test_short_histories_kept_with_nan_adx(tmp_path):
+    scanner = stored_scanner(tmp_path, 24)
+    daily = scanner.get_stock_data("TEST.NS", "3mo")
+    assert len(daily) == 24 and np.isnan(daily["ADX"].iloc[-1])
+    assert scanner.build_indicator_panel(["TEST.NS"]).symbols == ["TEST.NS"]
+
+    weekly = stored_scanner(tmp_path / "weekly", 100).get_weekly_stock_data("TEST.NS")
+    assert 15 <= len(weekly) < 2 * app.ADX_WINDOW and np.isnan(weekly["ADX"].iloc[-1])
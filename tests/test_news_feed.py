@@ -0,0 +1,36 @@
+"""Background news lookups: cached results are reused, failed ones are retried."""
+import streamlit_app as app
+
+
+def make_feed(monkeypatch, results):
+    feed = app.NewsFeed(max_concurrent=1)
+    calls = []
+
+    def lookup(symbol, name):
+        calls.append(symbol)
+        return results.pop(0)
+
+    monkeypatch.setattr(feed._scanner, "get_fundamental_news", lookup)
+    return feed, calls
+
+
+def test_cached_news_is_not_fetched_again(monkeypatch):
+    news = {'news_items': [], 'overall_sentiment': 'neutral', 'news_count': 0, 'lookup_failed': False}
+    feed, calls = make_feed(monkeypatch, [news])
+    feed.request("ABC.NS", 600).result()
+    assert feed.request("ABC.NS", 600) is None
+    assert feed.get("ABC.NS", 600) == news
+    assert calls == ["ABC.NS"]
+
+
+def test_failed_lookup_is_retried_after_retry_ttl(monkeypatch):
+    failed = {'news_items': [], 'overall_sentiment': 'neutral', 'news_count': 0, 'lookup_failed': True}
+    news = {'news_items': [], 'overall_sentiment': 'neutral', 'news_count': 0, 'lookup_failed': False}
+    feed, calls = make_feed(monkeypatch, [failed, news])
+    feed.request("ABC.NS", 600).result()
+    assert feed.get("ABC.NS", 600) == failed
+
+    monkeypatch.setattr(app, "NEWS_RETRY_SECONDS", -1)  # Let the failure expire
+    assert feed.get("ABC.NS", 600) is None
+    assert feed.request("ABC.NS", 600).result() == news
+    assert calls == ["ABC.NS", "ABC.NS"]
@@ -0,0 +1,31 @@
+"""Headline relevance and sentiment from the shared keyword matcher."""
+import pytest
+
+import streamlit_app as app
+
+HEADLINES = [
+    ("Shares declined after weak results", 'high', -2),
+    ("Sales declining", 'low', -1),
+    ("Stock dropped on profit warning", 'low', -1),
+    ("Company wins orders worth Rs 500 crore", 'high', 2),
+    ("Profit fell on rising costs", 'low', 0),
+    ("Board considers new policies", 'medium', 0),
+    ("No keywords here", 'low', 0),
+]
+
+
+@pytest.mark.parametrize("headline, relevance, sentiment", HEADLINES)
+def test_score(headline, relevance, sentiment):
+    assert app.NEWS_KEYWORD_MATCHER.score(headline) == (relevance, sentiment)
+
+
+def test_score_many_matches_score():
+    relevances, sentiments = app.NEWS_KEYWORD_MATCHER.score_many(headline for headline, _, _ in HEADLINES)
+    assert list(relevances) == [relevance for _, relevance, _ in HEADLINES]
+    assert list(sentiments) == [sentiment for _, _, sentiment in HEADLINES]
+
+
+def test_variants_cover_e_drop_and_doubling():
+    assert {'declined', 'declining', 'declines'} <= app.keyword_variants('decline')
+    assert {'dropped', 'dropping', 'drops'} <= app.keyword_variants('drop')
+    assert 'wined' not in app.keyword_variants('win')
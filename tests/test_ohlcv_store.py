@@ -0,0 +1,50 @@
+"""The local OHLCV store serves recent listings without re-downloading their full history."""
+import os
+
+import numpy as np
+import pandas as pd
+
+import streamlit_app as app
+
+
+def listing_bars(periods=60):
+    index = pd.bdate_range(end=app.get_trading_date(), periods=periods)
+    close = np.linspace(100, 120, periods)
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": np.full(periods, 200_000.0)}, index=index)
+
+
+def fake_download(calls, frame):
+    def download(symbols, **kwargs):
+        calls.append(kwargs)
+        bars = frame if 'period' in kwargs else frame[frame.index >= pd.Timestamp(kwargs['start'])]
+        return bars.copy()
+    return download
+
+
+def test_short_history_served_from_store(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app.yf, "download", fake_download(calls, listing_bars()))
+    store = app.OHLCVStore(root=str(tmp_path))
+
+    app.ProfessionalPCSScanner(store=store).prefetch_price_history(["NEW.NS"])
+    assert len(calls) == 1 and 'period' in calls[0]
+    assert store.covers("NEW.NS", store.load("NEW.NS"), app.HISTORY_PERIOD)
+
+    # A later scan with the file already fresh downloads nothing
+    scanner = app.ProfessionalPCSScanner(store=app.OHLCVStore(root=str(tmp_path)))
+    scanner.prefetch_price_history(["NEW.NS"])
+    assert len(calls) == 1
+    assert len(scanner.get_stock_data("NEW.NS", "3mo")) > 0
+
+
+def test_stale_short_history_is_topped_up(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app.yf, "download", fake_download(calls, listing_bars()))
+    store = app.OHLCVStore(root=str(tmp_path))
+    app.ProfessionalPCSScanner(store=store).prefetch_price_history(["NEW.NS"])
+    stale = os.path.getmtime(store._path("NEW.NS")) - 7 * 86400
+    os.utime(store._path("NEW.NS"), (stale, stale))
+
+    app.ProfessionalPCSScanner(store=app.OHLCVStore(root=str(tmp_path))).prefetch_price_history(["NEW.NS"])
+    assert len(calls) == 2 and 'start' in calls[1]
@@ -0,0 +1,17 @@
+"""Scan-cache keys must only change with settings that change what a scan finds."""
+from datetime import datetime, timedelta
+
+import streamlit_app as app
+
+
+def test_fingerprint_ignores_market_sentiment_refresh():
+    config = app.default_scan_config()
+    now = datetime.now(app.IST)
+    first = dict(config, market_sentiment={'overall': {'sentiment': 'BULLISH'}, 'as_of': now})
+    refreshed = dict(config, market_sentiment={'overall': {'sentiment': 'BEARISH'}, 'as_of': now + timedelta(minutes=5)})
+    assert app.config_fingerprint(first) == app.config_fingerprint(refreshed)
+
+
+def test_fingerprint_tracks_filters():
+    config = app.default_scan_config()
+    assert app.config_fingerprint(config) != app.config_fingerprint(dict(config, rsi_min=config['rsi_min'] + 5))
@@ -0,0 +1,46 @@
+"""End-of-day snapshots must load back as the records a live scan produces, and only once final."""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import streamlit_app as app
+
+
+def make_snapshot(created_at, trading_date='2026-10-16'):
+    level = {'level': np.float64(101.5), 'date': pd.Timestamp('2026-10-09')}
+    record = app.ScanResult(
+        'ABC.NS', 102.0, 1.4, {}, 55.0, 24.0, trading_date, 100.0, 103.0, 99.0, 102.0,
+        patterns=[], enhancements={'enhanced_sr': {'support_levels': [level]}},
+    )
+    return {
+        'trading_date': trading_date,
+        'created_at': created_at,
+        'detection_fingerprint': 'f' * 40,
+        'universe': ['ABC.NS'],
+        'stage_stats': [],
+        'timed_out': [],
+        'symbol_timeout': 30,
+        'market_sentiment': {'overall': {'sentiment': 'BULLISH'}, 'as_of': created_at},
+        'results': [record],
+    }
+
+
+def test_snapshot_round_trip_restores_timestamps(tmp_path):
+    store = app.ScanSnapshotStore(root=str(tmp_path))
+    store.save(make_snapshot(app.IST.localize(datetime(2026, 10, 16, 16, 15))))
+    loaded = store.load('2026-10-16', 'f' * 40)
+    level = loaded['results'][0].enhancements['enhanced_sr']['support_levels'][0]
+    assert level == {'level': 101.5, 'date': pd.Timestamp('2026-10-09')}
+    assert isinstance(level['date'], pd.Timestamp)
+    assert loaded['created_at'] == app.IST.localize(datetime(2026, 10, 16, 16, 15))
+    assert loaded['market_sentiment']['as_of'] == loaded['created_at']
+    assert loaded['market_sentiment']['as_of'].tzinfo is not None
+
+
+def test_snapshot_is_final_only_after_the_close():
+    after_close = app.IST.localize(datetime(2026, 10, 16, 17, 0))
+    assert app.snapshot_is_final(make_snapshot(app.IST.localize(datetime(2026, 10, 16, 16, 15))), after_close)
+    assert not app.snapshot_is_final(make_snapshot(app.IST.localize(datetime(2026, 10, 16, 15, 0))), after_close)
+    intraday = app.IST.localize(datetime(2026, 10, 19, 11, 30))
+    assert not app.snapshot_is_final(make_snapshot(app.IST.localize(datetime(2026, 10, 19, 11, 0)), '2026-10-19'), intraday)